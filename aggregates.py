@@ -0,0 +1,122 @@
+import argparse
+import time
+
+import numpy as np
+
+from engine import play
+from rosters import TRACK_LENGTH, get_roster
+from runner import CHUNK_SIZE, chunk_seed, make_rng, map_chunks, split_chunks
+from skills import compile_roster
+
+# 流式汇总：在模拟循环里更新定长累加器，不保存逐局数据，内存只取决于 赛道长度 × 人数 × 最大轮数
+#   rounds[r]            比赛在第 r 轮结束的局数
+#   heatmap[r, i, c]     第 r 轮结束时团子 i 位于格子 c 的次数（r = 0 为起点，结束那一轮记录终局位置）
+#   stacks[c, k]         每轮结束时格子 c 恰好有 k 个团子的次数
+# 超过 max_rounds 的轮数计入最后一行；每轮开始前通过 engine.play 的 stop 回调观察棋盘
+# 各进程的累加器逐元素相加合并，结束时导出为 numpy 数组（.npz）
+
+MAX_ROUNDS = 32
+
+
+class Aggregates:
+    def __init__(self, n_players, track_length=TRACK_LENGTH, max_rounds=MAX_ROUNDS):
+        self.n_players = n_players
+        self.track_length = track_length
+        self.max_rounds = max_rounds
+        self.games = 0
+        self.wins = [0] * n_players
+        self.rounds = [0] * (max_rounds + 1)
+        # 扁平列表：下标计算比 numpy 单元素更新快得多
+        self.heatmap = [0] * ((max_rounds + 1) * n_players * (track_length + 1))
+        self.stacks = [0] * ((track_length + 1) * (n_players + 1))
+
+    def observe(self, game):
+        # 作为 engine.play 的 stop 回调，每轮开始前调用；返回 None，不会中止比赛
+        board = game.board
+        width = self.track_length + 1
+        base = min(game.rounds, self.max_rounds) * self.n_players * width
+        heatmap = self.heatmap
+        for i, c in enumerate(board.cell):
+            heatmap[base + i * width + c] += 1
+        stacks = self.stacks
+        k = self.n_players + 1
+        for c, stack in board.stacks.items():
+            stacks[c * k + len(stack)] += 1
+
+    def finish(self, game):
+        # 比赛结束：记录胜者、轮数与终局位置
+        self.observe(game)
+        self.games += 1
+        self.wins[game.winner] += 1
+        self.rounds[min(game.rounds, self.max_rounds)] += 1
+
+    def merge(self, other):
+        self.games += other.games
+        for name in ("wins", "rounds", "heatmap", "stacks"):
+            setattr(self, name, [a + b for a, b in zip(getattr(self, name), getattr(other, name))])
+        return self
+
+    def to_arrays(self):
+        width = self.track_length + 1
+        return {
+            "games": np.int64(self.games),
+            "wins": np.array(self.wins, dtype=np.int64),
+            "rounds": np.array(self.rounds, dtype=np.int64),
+            "heatmap": np.array(self.heatmap, dtype=np.int64).reshape(self.max_rounds + 1, self.n_players, width),
+            "stacks": np.array(self.stacks, dtype=np.int64).reshape(width, self.n_players + 1),
+        }
+
+    def save(self, path):
+        np.savez_compressed(path, **self.to_arrays())
+
+
+def aggregate_chunk(key, chunk_id, n, seed, max_rounds=MAX_ROUNDS, track_length=TRACK_LENGTH):
+    table = compile_roster(get_roster(key), track_length=track_length)
+    rng = make_rng(chunk_seed(seed, chunk_id))
+    agg = Aggregates(table.n_players, track_length, max_rounds)
+    observe = agg.observe
+    for _ in range(n):
+        agg.finish(play(table, rng, stop=observe))
+    return agg
+
+
+def run_aggregates(key, simulations, seed=0, workers=None, max_rounds=MAX_ROUNDS, track_length=TRACK_LENGTH,
+                   chunk_size=CHUNK_SIZE):
+    # 按块合并，任何时刻只持有一份累加器与正在返回的块
+    total = Aggregates(len(get_roster(key)["players"]), track_length, max_rounds)
+    args = [(key, chunk_id, n, seed, max_rounds, track_length) for chunk_id, n in split_chunks(simulations, chunk_size)]
+    for agg in map_chunks(aggregate_chunk, args, workers):
+        total.merge(agg)
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="定长内存的流式统计：轮数、位置热力图、堆叠大小")
+    parser.add_argument("roster", nargs="?", default="race1")
+    parser.add_argument("-n", "--simulations", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--max-rounds", type=int, default=MAX_ROUNDS, help="超过该轮数的统计并入最后一行")
+    parser.add_argument("--track-length", type=int, default=TRACK_LENGTH)
+    parser.add_argument("-o", "--output", default="aggregates.npz")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    agg = run_aggregates(args.roster, args.simulations, args.seed, args.workers, args.max_rounds, args.track_length)
+    agg.save(args.output)
+    elapsed = time.perf_counter() - start
+
+    arrays = agg.to_arrays()
+    games = agg.games
+    rounds = arrays["rounds"]
+    names = [name for _, name in get_roster(args.roster)["players"]]
+    print(f"{games} 局，结果写入 {args.output}（耗时 {elapsed:.2f}s）")
+    print(f"平均 {(rounds * np.arange(len(rounds))).sum() / games:.2f} 轮，轮数分布：")
+    for r in np.nonzero(rounds)[0]:
+        print(f"  {r}{'+' if r == args.max_rounds else ''} 轮: {rounds[r] / games * 100:.2f}%")
+    stacks = arrays["stacks"].sum(axis=0)
+    observed = stacks.sum()
+    print("有团子的格子中堆叠大小分布：" + "，".join(
+        f"{k}个 {stacks[k] / observed * 100:.1f}%" for k in range(1, len(stacks)) if stacks[k]))
+    for i, name in enumerate(names):
+        print(f"{name}: 胜率 {arrays['wins'][i] / games * 100:.2f}%")
@@ -0,0 +1,81 @@
+# 别名表（Vose）步数采样：把 骰子 + 独立的额外步数 合并成一个离散分布，每次移动只取一个均匀数
+# u * n 的整数部分选列，小数部分与该列的概率比较决定取本值还是别名
+# 只改变随机数的用法，不改变每回合步数的分布；技能概率判定不再单独发生，
+# 所以统计技能判定次数的模式（instrument / reweight / records）与逐次重放不使用别名表
+# 实测没有可测的提速，各工具默认不启用；compile_roster(..., alias=True) 时使用，equivalence.py --candidate alias 检验分布
+
+DICE = {1: 1 / 3, 2: 1 / 3, 3: 1 / 3}
+
+
+def convolve(dist, bonus, p):
+    # dist 中每个点数以概率 p 额外加 bonus
+    out = {}
+    for value, q in dist.items():
+        out[value] = out.get(value, 0) + q * (1 - p)
+        out[value + bonus] = out.get(value + bonus, 0) + q * p
+    return {value: q for value, q in out.items() if q > 0}
+
+
+def build(dist):
+    # 返回 (取值, 本列概率, 别名)
+    values = list(dist)
+    n = len(values)
+    scaled = [dist[v] * n for v in values]
+    prob = [1.0] * n
+    alias = list(values)
+    small = [k for k, s in enumerate(scaled) if s < 1]
+    large = [k for k, s in enumerate(scaled) if s >= 1]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s] = scaled[s]
+        alias[s] = values[l]
+        scaled[l] -= 1 - scaled[s]
+        (small if scaled[l] < 1 else large).append(l)
+    return values, prob, alias
+
+
+def sampler(dist):
+    # 返回 draw(u)：u 为 [0, 1) 上的均匀数
+    values, prob, alias = build(dist)
+    n = len(values)
+
+    def draw(u):
+        x = u * n
+        k = int(x)
+        return values[k] if x - k < prob[k] else alias[k]
+    return draw
+
+
+def roll_hook(draw):
+    def roll(game, i):
+        return draw(game.rng.random())
+    return roll
+
+
+def feibi_hooks(params):
+    return {"roll": roll_hook(sampler(convolve(DICE, 1, params["FeiBi"]))), "step_bonus": None}
+
+
+def katixiya_hooks(params):
+    # 增益生效前后各一张表
+    plain = sampler(DICE)
+    buffed = sampler(convolve(DICE, 2, params["KaTiXiYa"]))
+
+    def roll(game, i):
+        return (buffed if game.buff_active[i] else plain)(game.rng.random())
+    return {"roll": roll, "step_bonus": None}
+
+
+def choice_hooks(values):
+    def hooks(params):
+        return {"roll": roll_hook(sampler({v: 1 / len(values) for v in values}))}
+    return hooks
+
+
+# 技能类型 -> 按技能参数生成替换用的挂钩；赞妮的下回合额外步数是确定性的，仍由原 step_bonus 处理
+STEP_HOOKS = {
+    "FeiBi": feibi_hooks,
+    "KaTiXiYa": katixiya_hooks,
+    "ShouAnRen": choice_hooks((2, 3)),
+    "Zanni": choice_hooks((1, 3)),
+}
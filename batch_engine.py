@@ -0,0 +1,162 @@
+import argparse
+import time
+from itertools import permutations
+
+import numpy as np
+
+from rosters import TRACK_LENGTH, get_roster
+from runner import print_places
+
+# 批量引擎：N 场比赛同步推进，每一步让所有未结束的比赛各走一个行动位
+# 数组按 (选手, 比赛) 存放，沿选手方向的归约都是整行向量运算
+# pos[j, g]    第 g 场中选手 j 所在格子
+# height[j, g] 选手 j 在该格堆叠中的高度（0 为底部）
+# 规则与 race4.py / race5.py 一致（卡卡罗按 rules 区分 race1 的堆叠底部条件）
+
+# 骰子：最小点数, 面数, 点数间隔
+DICE = {
+    "Player": (1, 3, 1),
+    "ShouAnRen": (2, 2, 1),  # 2 或 3
+    "Zanni": (1, 2, 2),      # 1 或 3
+}
+
+BATCH_KINDS = ("Player", "FeiBi", "ShouAnRen", "Zanni", "BuLanTe", "LuoKeKe", "KaKaLuo")
+
+# 回合结束时存活比例低于该值才压缩数组，其余时间已结束的比赛只做屏蔽
+COMPACT_RATIO = 0.9
+
+
+def check_roster(roster):
+    unsupported = [kind for kind, _ in roster["players"] if kind not in BATCH_KINDS]
+    if unsupported:
+        raise ValueError(f"批量引擎不支持以下技能: {', '.join(unsupported)}")
+
+
+def simulate_batch(roster, n_games, rng, track_length=TRACK_LENGTH):
+    check_roster(roster)
+    kinds = [kind for kind, _ in roster["players"]]
+    n_players = len(kinds)
+    kakaluo_bottom = roster["rules"] == "race1"
+
+    dice = np.array([DICE.get(kind, DICE["Player"]) for kind in kinds], dtype=np.int16)
+    dice_low, dice_faces, dice_stride = (dice[:, k:k + 1] for k in range(3))
+    feibi = [j for j, kind in enumerate(kinds) if kind == "FeiBi"]
+    zanni = [j for j, kind in enumerate(kinds) if kind == "Zanni"]
+    kakaluo = [j for j, kind in enumerate(kinds) if kind == "KaKaLuo"]
+    bulante = [j for j, kind in enumerate(kinds) if kind == "BuLanTe"]
+    luokeke = [j for j, kind in enumerate(kinds) if kind == "LuoKeKe"]
+
+    # 所有排列的表，抽下标即可得到均匀随机排列
+    perms = np.array(list(permutations(range(n_players))), dtype=np.int64).T
+
+    # 起点随机堆叠
+    pos = np.zeros((n_players, n_games), dtype=np.int16)
+    height = perms[:, rng.integers(0, perms.shape[1], n_games)].astype(np.int16)
+    extra = np.zeros((n_players, n_games), dtype=np.int16)  # 赞妮的下回合额外步数
+    player_ids = np.arange(n_players)[:, None]
+    places = np.zeros((n_players, n_players), dtype=np.int64)  # places[j, r]: 选手 j 第 r+1 名的场数
+    alive = np.ones(n_games, dtype=bool)
+
+    while alive.any():
+        m = len(alive)
+        cols = np.arange(m)
+
+        # 一回合所需的随机数一次抽好
+        order = perms[:, rng.integers(0, perms.shape[1], m)]
+        rolls = dice_low + (rng.integers(0, 6, (n_players, m), dtype=np.int16) % dice_faces) * dice_stride
+        coins = rng.random((n_players, m), dtype=np.float32) if feibi or zanni else None
+
+        for slot in range(n_players):
+            mover = order[slot]
+            flat = mover * m + cols
+            cur = np.take(pos, flat)
+            h = np.take(height, flat)
+            steps = np.take(rolls, flat)
+
+            for j in feibi:
+                steps += (mover == j) & (coins[slot] < 0.5)
+            for j in zanni:
+                steps += (mover == j) * extra[j]
+            if slot == 0:
+                for j in bulante:
+                    steps += 2 * (mover == j)
+            if slot == n_players - 1:
+                for j in luokeke:
+                    steps += 2 * (mover == j)
+            if kakaluo:
+                last = cur == pos.min(axis=0)
+                if kakaluo_bottom:
+                    last &= h == 0
+                for j in kakaluo:
+                    steps += 3 * ((mover == j) & last)
+
+            # 自身及上方团子一起移动，叠到新格子顶部；已结束的比赛不再移动
+            new_pos = np.minimum(cur + steps, track_length)
+            group = (pos == cur) & (height >= h) & alive
+            base = (pos == new_pos).sum(axis=0, dtype=np.int16)
+            height += group * (base - h)
+            pos += group * (new_pos - cur)
+
+            # 赞妮：移动后处于堆叠状态，40% 概率下回合额外前进 2 格
+            if zanni:
+                stacked = (base + group.sum(axis=0, dtype=np.int16) > 1) & (new_pos < track_length)
+                for j in zanni:
+                    extra[j] = np.where(mover == j, 2 * (stacked & (coins[slot] < 0.4)), extra[j])
+
+            done = alive & (new_pos >= track_length)
+            if done.any():
+                # 名次：格子更靠前、或同格更高的团子数
+                key = pos[:, done] * n_players + height[:, done]
+                ranks = (key[None, :, :] > key[:, None, :]).sum(axis=1)
+                places += np.bincount((player_ids * n_players + ranks).ravel(),
+                                      minlength=n_players * n_players).reshape(n_players, n_players)
+                alive &= ~done
+                if not alive.any():
+                    break
+
+        if alive.sum() < COMPACT_RATIO * m:
+            keep = np.flatnonzero(alive)
+            pos, height, extra = pos[:, keep], height[:, keep], extra[:, keep]
+            alive = alive[keep]
+
+    return places
+
+
+def run_places(key, simulations, seed=None, batch_size=100000, track_length=TRACK_LENGTH):
+    roster = get_roster(key)
+    rng = np.random.default_rng(seed)
+    n_players = len(roster["players"])
+    places = np.zeros((n_players, n_players), dtype=np.int64)
+    remaining = simulations
+    while remaining > 0:
+        n = min(batch_size, remaining)
+        places += simulate_batch(roster, n, rng, track_length)
+        remaining -= n
+    return [name for _, name in roster["players"]], places.tolist()
+
+
+def run(key, simulations, seed=None, batch_size=100000, track_length=TRACK_LENGTH):
+    names, places = run_places(key, simulations, seed, batch_size, track_length)
+    return {name: row[0] for name, row in zip(names, places)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="numpy 批量模拟")
+    parser.add_argument("roster", nargs="?", default="race5")
+    parser.add_argument("-n", "--simulations", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=100000)
+    parser.add_argument("--places", action="store_true", help="输出完整名次分布")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    names, places = run_places(args.roster, args.simulations, args.seed, args.batch_size)
+    results = {name: row[0] for name, row in zip(names, places)}
+    elapsed = time.perf_counter() - start
+
+    print(f"模拟次数：{args.simulations}次（耗时 {elapsed:.2f}s）")
+    print("胜率统计：")
+    for name, wins in sorted(results.items(), key=lambda x: x[1], reverse=True):
+        print(f"{name}: {wins}次 ({wins/args.simulations*100:.2f}%)")
+    if args.places:
+        print_places(names, places, args.simulations)
@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from engine import play
+from rosters import ROSTERS, get_roster
+from runner import ENGINES, run_chunk
+from skills import compile_roster
+
+# 基准测试：每个阵容 × 每个引擎用固定种子跑固定场数，记录 场/秒、每步耗时和峰值内存
+# 引擎列表直接取 runner.ENGINES，新增引擎会自动纳入
+# 每步耗时 = 耗时 / (场数 × 平均步数)，平均步数由单局引擎在同一阵容上统计（各引擎规则等价）
+# 每次运行先在本机计时一个固定的校准负载（race1 原脚本循环），各结果的 relative = 场/秒 ÷ 校准负载的场/秒
+# 与基准文件比较的是 relative，与机器快慢无关；relative 下降超过阈值即判为退化，退出码为 1
+# 只比较场数与基准相同的项：批量引擎的吞吐随每批场数变化，场数不同的结果没有可比性
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+THRESHOLD = 0.2
+SEED = 20250516
+GAMES = {"reference": 3000, "fast": 3000, "batch": 200000}
+REPEAT = 3  # 取多次计时中的最快一次，降低机器抖动的影响
+CALIBRATION = ("reference", "race1", 2000)  # 校准负载：引擎、阵容、场数
+
+
+def mean_turns(key, games, seed=SEED):
+    import random
+
+    # 与被计时的 fast 引擎使用同一张挂钩表
+    table = compile_roster(get_roster(key))
+    rng = random.Random(seed)
+    turns = 0
+    for _ in range(games):
+        turns += play(table, rng).turns
+    return turns / games
+
+
+def best_time(engine, key, games, seed=SEED, repeat=REPEAT):
+    run_chunk(engine, key, 0, min(games, 100), seed)  # 预热：导入模块、编译挂钩表
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_chunk(engine, key, 0, games, seed)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed
+
+
+def calibrate(repeat=REPEAT):
+    # 本机校准负载的 场/秒
+    engine, key, games = CALIBRATION
+    return games / best_time(engine, key, games, repeat=repeat)
+
+
+def bench_one(engine, key, games, turns_per_game, seed=SEED, repeat=REPEAT):
+    elapsed = best_time(engine, key, games, seed, repeat)
+
+    tracemalloc.start()
+    run_chunk(engine, key, 0, games, seed)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "games": games,
+        "games_per_sec": games / elapsed,
+        "ns_per_move": elapsed / (games * turns_per_game) * 1e9,
+        "peak_kb": peak / 1024,
+    }
+
+
+def supported(engine, key):
+    if engine != "batch":
+        return True
+    from batch_engine import BATCH_KINDS
+
+    return all(kind in BATCH_KINDS for kind, _ in get_roster(key)["players"])
+
+
+def run_benchmarks(rosters, engines, games=None, repeat=REPEAT):
+    games = {**GAMES, **(games or {})}
+    calibration = calibrate(max(repeat, REPEAT))  # 校准负载较小，至少计时 REPEAT 次
+    results = {}
+    for key in rosters:
+        turns = mean_turns(key, 2000)
+        for engine in engines:
+            if not supported(engine, key):
+                continue
+            r = bench_one(engine, key, games.get(engine, GAMES["fast"]), turns, repeat=repeat)
+            r["relative"] = r["games_per_sec"] / calibration
+            results[f"{key}/{engine}"] = r
+    return results
+
+
+def load_baseline(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def comparable(r, base):
+    # 没有 relative 的旧基准项、场数不同的项不参与比较
+    return base is not None and "relative" in base and base["games"] == r["games"]
+
+
+def find_regressions(results, baseline, threshold=THRESHOLD):
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if comparable(r, base) and r["relative"] < base["relative"] * (1 - threshold):
+            regressions.append(name)
+    return regressions
+
+
+def print_report(results, baseline):
+    # 中文字符按两个宽度对齐
+    print(f"{'基准':<16}{'场/秒':>12}{'ns/步':>9}{'峰值KB':>8}{'相对校准':>8}{'对比基准':>8}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        ratio = f"{r['relative'] / base['relative'] * 100:.0f}%" if comparable(r, base) else "-"
+        print(f"{name:<18}{r['games_per_sec']:>14.0f}{r['ns_per_move']:>10.0f}{r['peak_kb']:>10.0f}"
+              f"{r['relative']:>12.2f}{ratio:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="各阵容、各引擎的吞吐基准")
+    parser.add_argument("--rosters", nargs="*", default=list(ROSTERS))
+    parser.add_argument("--engines", nargs="*", default=list(ENGINES))
+    parser.add_argument("--games", type=int, default=None, help="覆盖所有引擎的场数")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="允许的吞吐下降比例")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="把本次结果写入基准文件")
+    args = parser.parse_args()
+
+    games = {engine: args.games for engine in args.engines} if args.games else None
+    results = run_benchmarks(args.rosters, args.engines, games, args.repeat)
+    baseline = load_baseline(args.baseline)
+    print_report(results, baseline)
+
+    if args.save:
+        save_baseline({**baseline, **results}, args.baseline)
+        print(f"已写入 {args.baseline}")
+    elif regressions := find_regressions(results, baseline, args.threshold):
+        print(f"吞吐退化超过 {args.threshold*100:.0f}%：{', '.join(regressions)}")
+        sys.exit(1)
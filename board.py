@@ -0,0 +1,219 @@
+import argparse
+import random
+import time
+from bisect import bisect_left, insort
+
+from rosters import TRACK_LENGTH
+
+# 棋盘：按格子保存堆叠（列表，底 -> 顶），并为每个团子维护 (格子, 高度) 索引
+# 查找团子位置 O(1)，移动只处理被带走的那一段，最后一名 / 领先格子随移动增量维护
+# cells 为有团子的格子的有序列表，排名（先比格子，再比堆叠高度）直接按它读出，无需每回合重新排序
+# 团子用 0..n-1 的编号表示
+
+
+class Board:
+    def __init__(self, n_players, track_length=TRACK_LENGTH):
+        self.n_players = n_players
+        self.track_length = track_length
+        self.stacks = {}
+        self.cells = []
+        self.cell = [0] * n_players
+        self.height = [0] * n_players
+        self.min_cell = 0
+        self.max_cell = 0
+
+    def place(self, order, cell=0):
+        # 按 order（底 -> 顶）把团子放到同一格
+        self.drop(list(order), cell)
+
+    def lift(self, player, carry_above=True):
+        # 从当前格取出自身（及上方团子），返回被取出的一段
+        cell = self.cell[player]
+        stack = self.stacks[cell]
+        h = self.height[player]
+        if carry_above:
+            group = stack[h:]
+            del stack[h:]
+        else:
+            group = [stack.pop(h)]
+            for i in range(h, len(stack)):
+                self.height[stack[i]] = i
+        if not stack:
+            del self.stacks[cell]
+            self._vacate(cell)
+        return group
+
+    def lift_all(self, cell):
+        group = self.stacks.pop(cell)
+        self._vacate(cell)
+        return group
+
+    def drop(self, group, cell):
+        # 把一段团子叠到 cell 顶部
+        if cell > self.track_length:
+            cell = self.track_length
+        stack = self.stacks.get(cell)
+        if stack is None:
+            stack = self.stacks[cell] = []
+            insort(self.cells, cell)
+            self.min_cell = self.cells[0]
+        h = len(stack)
+        stack += group
+        cells, heights = self.cell, self.height
+        for p in group:
+            cells[p] = cell
+            heights[p] = h
+            h += 1
+        if cell > self.max_cell:
+            self.max_cell = cell
+        return cell
+
+    def move(self, player, steps, carry_above=True):
+        # 等价于 drop(lift(player), cell + steps)；带上方团子是热路径，合并成一次以减少方法调用与属性查找
+        if not carry_above:
+            return self.drop(self.lift(player, False), self.cell[player] + steps)
+        stacks, cells = self.stacks, self.cell
+        cell = cells[player]
+        stack = stacks[cell]
+        h = self.height[player]
+        if h:
+            group = stack[h:]
+            del stack[h:]
+        else:
+            group = stack
+            del stacks[cell]
+            self._vacate(cell)
+        target = cell + steps
+        if target > self.track_length:
+            target = self.track_length
+        dest = stacks.get(target)
+        if dest is None:
+            # 落到空格：整段直接成为新堆叠，高度不变
+            stacks[target] = group
+            insort(self.cells, target)
+            self.min_cell = self.cells[0]
+            if h:
+                for k, p in enumerate(group):
+                    self.height[p] = k
+        else:
+            heights = self.height
+            k = len(dest)
+            dest += group
+            for p in group:
+                heights[p] = k
+                k += 1
+        for p in group:
+            cells[p] = target
+        if target > self.max_cell:
+            self.max_cell = target
+        return target
+
+    def raise_to_top(self, player):
+        # 同格内移到堆叠顶端
+        stack = self.stacks[self.cell[player]]
+        h = self.height[player]
+        stack.pop(h)
+        for i in range(h, len(stack)):
+            self.height[stack[i]] = i
+        self.height[player] = len(stack)
+        stack.append(player)
+
+    def _vacate(self, cell):
+        cells = self.cells
+        del cells[bisect_left(cells, cell)]
+        if cells:
+            self.min_cell = cells[0]
+
+    def stack(self, cell):
+        return self.stacks.get(cell, ())
+
+    def is_top(self, player):
+        return self.height[player] == len(self.stacks[self.cell[player]]) - 1
+
+    def is_last(self, player):
+        return self.cell[player] == self.min_cell
+
+    def last_player(self):
+        return self.stacks[self.min_cell][0]
+
+    def leader(self):
+        return self.stacks[self.max_cell][-1]
+
+    def finished(self):
+        return self.max_cell >= self.track_length
+
+    def ranking(self):
+        # 第一名在前：格子靠前的在前，同格越靠近顶部越靠前
+        stacks = self.stacks
+        return [p for cell in reversed(self.cells) for p in reversed(stacks[cell])]
+
+    def snapshot(self):
+        return tuple((cell, tuple(stack)) for cell, stack in sorted(self.stacks.items()))
+
+    def restore(self, snapshot):
+        # 由 snapshot() 的结果重建棋盘
+        self.stacks = {cell: list(stack) for cell, stack in snapshot}
+        self.cells = sorted(self.stacks)
+        for cell, stack in snapshot:
+            for h, p in enumerate(stack):
+                self.cell[p] = cell
+                self.height[p] = h
+        self.min_cell = self.cells[0]
+        self.max_cell = self.cells[-1]
+
+
+# ------------ 基准测试 ------------
+# 随机挑团子前进 1~3 格并查询是否最后一名，到达终点后重新开局
+def bench_board(n_players, track_length, moves, rng):
+    order = list(range(n_players))
+    board = None
+    start = time.perf_counter()
+    for _ in range(moves):
+        if board is None or board.finished():
+            board = Board(n_players, track_length)
+            rng.shuffle(order)
+            board.place(order)
+        player = rng.randrange(n_players)
+        board.move(player, rng.randint(1, 3))
+        board.is_last(player)
+    return (time.perf_counter() - start) / moves * 1e9
+
+
+def bench_lists(n_players, track_length, moves, rng):
+    # 原脚本的做法：defaultdict(list) + stack.index + 每次重新求最小位置
+    from collections import defaultdict
+
+    stacks = None
+    start = time.perf_counter()
+    for _ in range(moves):
+        if stacks is None or max(stacks) >= track_length:
+            position = [0] * n_players
+            stacks = defaultdict(list)
+            stacks[0] = list(range(n_players))
+            rng.shuffle(stacks[0])
+        player = rng.randrange(n_players)
+        stack = stacks[position[player]]
+        index = stack.index(player)
+        group = stack[index:]
+        del stack[index:]
+        if not stack:
+            del stacks[position[player]]
+        new_pos = min(position[player] + rng.randint(1, 3), track_length)
+        stacks[new_pos].extend(group)
+        for p in group:
+            position[p] = new_pos
+        min(position)
+    return (time.perf_counter() - start) / moves * 1e9
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="棋盘结构基准：每次移动耗时随场上团子数的变化")
+    parser.add_argument("--moves", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'团子数':>6} {'赛道':>6} {'Board ns/步':>12} {'列表 ns/步':>12}")
+    for n_players, track_length in [(6, 24), (24, 240), (100, 1000), (400, 4000), (1600, 10000)]:
+        board_ns = bench_board(n_players, track_length, args.moves, random.Random(args.seed))
+        lists_ns = bench_lists(n_players, track_length, args.moves, random.Random(args.seed))
+        print(f"{n_players:>6} {track_length:>6} {board_ns:>12.0f} {lists_ns:>12.0f}")
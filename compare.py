@@ -0,0 +1,120 @@
+import argparse
+import time
+from statistics import NormalDist
+
+from engine import play
+from rosters import TRACK_LENGTH, get_roster
+from rng import StreamRandom
+from runner import CHUNK_SIZE, chunk_seed, map_chunks, split_chunks
+from skills import DEFAULT_PARAMS, compile_roster
+
+# 配对比较：基准规则与变体规则逐局使用同一组随机流（公共随机数）
+# 每局用 (seed, 块编号, 局号) 重新播种 StreamRandom，开局堆叠、行动顺序、骰子、技能判定都一一对应，
+# 技能概率的改动只改变判定阈值，同一个均匀数在两边各判一次
+# 对每个选手 d = [变体胜] - [基准胜]，报告 d 的均值（胜率差）及其置信区间，
+# 并与两组独立模拟的方差相比，给出等效的场数倍数
+
+
+def parse_overrides(items):
+    # "JinXi=0.5" -> {"JinXi": 0.5}；track_length 单独处理
+    params = {}
+    track_length = None
+    for item in items or []:
+        key, _, value = item.partition("=")
+        if key == "track_length":
+            track_length = int(value)
+        elif key in DEFAULT_PARAMS:
+            params[key] = float(value)
+        else:
+            raise ValueError(f"未知参数: {key}，可选: track_length, {', '.join(DEFAULT_PARAMS)}")
+    return params, track_length
+
+
+def paired_chunk(key, chunk_id, n, seed, base, variant):
+    # base / variant 为 (params, track_length)
+    roster = get_roster(key)
+    table_a = compile_roster(roster, *base)
+    table_b = compile_roster(roster, *variant)
+    rng = StreamRandom()
+    p = table_a.n_players
+    wins_a = [0] * p
+    wins_b = [0] * p
+    only_a = [0] * p  # 只有基准中获胜的局数
+    only_b = [0] * p
+    game_seed = chunk_seed(seed, chunk_id)
+    for g in range(n):
+        rng.seed(game_seed + g)
+        a = play(table_a, rng).winner
+        rng.seed(game_seed + g)
+        b = play(table_b, rng).winner
+        wins_a[a] += 1
+        wins_b[b] += 1
+        if a != b:
+            only_a[a] += 1
+            only_b[b] += 1
+    return wins_a, wins_b, only_a, only_b
+
+
+def run_paired(key, simulations, variant, base=({}, TRACK_LENGTH), seed=0, workers=None, chunk_size=CHUNK_SIZE):
+    # 返回 (名字, 基准胜场, 变体胜场, 只有基准胜, 只有变体胜) 四个按选手编号的列表
+    names = [name for _, name in get_roster(key)["players"]]
+    totals = [[0] * len(names) for _ in range(4)]
+    args = [(key, chunk_id, n, seed, base, variant) for chunk_id, n in split_chunks(simulations, chunk_size)]
+    for counts in map_chunks(paired_chunk, args, workers):
+        for total, part in zip(totals, counts):
+            for i, c in enumerate(part):
+                total[i] += c
+    return names, *totals
+
+
+def paired_difference(n, wins_a, wins_b, only_a, only_b, confidence=0.95):
+    # d 只取 -1 / 0 / 1，E[d²] = (只有一边胜的局数) / n
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    diff = (wins_b - wins_a) / n
+    paired_var = (only_a + only_b) / n - diff * diff
+    pa, pb = wins_a / n, wins_b / n
+    independent_var = pa * (1 - pa) + pb * (1 - pb)
+    halfwidth = z * (paired_var / n) ** 0.5
+    reduction = independent_var / paired_var if paired_var > 0 else float("inf")
+    return diff, halfwidth, reduction
+
+
+def print_comparison(names, n, wins_a, wins_b, only_a, only_b, confidence=0.95):
+    print(f"配对模拟：{n}局，{confidence*100:.0f}% 置信区间")
+    print(f"{'团子':<6}{'基准':>8}{'变体':>9}{'胜率差':>10}{'方差缩减':>10}")
+    for i, name in enumerate(names):
+        diff, hw, reduction = paired_difference(n, wins_a[i], wins_b[i], only_a[i], only_b[i], confidence)
+        print(
+            name.ljust(8 - len(name))
+            + f"{wins_a[i] / n * 100:9.2f}%{wins_b[i] / n * 100:9.2f}%"
+            + f"{diff * 100:+8.2f}±{hw * 100:.2f}%"
+            + (f"{reduction:9.1f}x" if reduction != float("inf") else "两组完全相同".rjust(7))
+        )
+    print("方差缩减：同样精度下独立模拟两组所需的场数 ÷ 配对模拟所需的场数")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="公共随机数配对比较两套规则参数")
+    parser.add_argument("roster", help="阵容，如 race1 ~ race5")
+    parser.add_argument("--set", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="变体参数，如 JinXi=0.5 ChangLi=0.7 track_length=20")
+    parser.add_argument("--base", nargs="*", default=[], metavar="KEY=VALUE", help="基准参数，默认为脚本原值")
+    parser.add_argument("-n", "--simulations", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    args = parser.parse_args()
+
+    base_params, base_length = parse_overrides(args.base)
+    base = (base_params, base_length or TRACK_LENGTH)
+    variant_params, variant_length = parse_overrides(args.set)
+    variant = ({**base_params, **variant_params}, variant_length or base[1])
+
+    start = time.perf_counter()
+    names, *counts = run_paired(args.roster, args.simulations, variant, base, args.seed, args.workers, args.chunk_size)
+    elapsed = time.perf_counter() - start
+
+    print(f"基准：{base[0] or '原参数'}，赛道 {base[1]}；变体：{variant[0] or '原参数'}，赛道 {variant[1]}")
+    print_comparison(names, args.simulations, *counts, confidence=args.confidence)
+    print(f"耗时 {elapsed:.2f}s")
@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Manager
+
+from odds_cache import OddsCache, query
+from rosters import ROSTERS, get_roster
+from runner import ENGINES, map_chunks, merge_results, run_chunk, split_chunks
+from skills import compile_roster
+from snapshot import make_state
+
+# 本地模拟服务：常驻进程，启动时导入引擎、编译全部阵容并预热进程池
+# 请求与响应都是 JSON：
+#   GET  /rosters    阵容列表
+#   POST /simulate   {"roster", "simulations", "seed", "engine"}
+#   POST /odds       {"roster", "stacks": {格子: [底 -> 顶的名字]}, "flags", "round", "order", "slot", "simulations"}
+# 场数不超过 inline_limit 的小查询直接在请求线程里算，省去进程间通信；其余按块提交到共享进程池
+# 每个请求一个线程，并发请求共用同一个进程池和同一个局面缓存
+
+HOST = "127.0.0.1"
+PORT = 8765
+INLINE_LIMIT = 2000
+CHUNK_SIZE = 2000
+BARRIER_TIMEOUT = 120  # 秒，启动时等待所有工作进程就绪
+
+
+def warm_up():
+    # 进程池的 initializer：每个工作进程启动时执行一次，导入引擎并编译所有阵容
+    for key in ROSTERS:
+        run_chunk("fast", key, 0, 1, 0)
+
+
+def wait_at(barrier):
+    barrier.wait(timeout=BARRIER_TIMEOUT)
+    return os.getpid()
+
+
+def positive(request, field, default=None):
+    # 场数字段必须为正整数，否则按 400 返回；缺省且 default 为 None 时返回 None
+    value = request.get(field, default)
+    if value is None:
+        return None
+    value = int(value)
+    if value <= 0:
+        raise ValueError(f"{field} 必须为正整数")
+    return value
+
+
+class Service:
+    def __init__(self, workers=None, cache_path=None, inline_limit=INLINE_LIMIT, chunk_size=CHUNK_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.inline_limit = inline_limit
+        self.chunk_size = chunk_size
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up)
+        # 提交 workers 个在同一屏障上等待的任务：每个任务占住一个工作进程，全部到齐才返回，
+        # 所以开始监听之前所有工作进程都已启动，并已由 initializer 预热
+        with Manager() as manager:
+            barrier = manager.Barrier(self.workers)
+            list(self.pool.map(wait_at, [barrier] * self.workers))
+        warm_up()
+        self.tables = {key: compile_roster(roster) for key, roster in ROSTERS.items()}
+        self.cache = OddsCache(cache_path)
+
+    def pool_for(self, simulations):
+        # 小查询在当前线程计算
+        return None if simulations <= self.inline_limit else self.pool
+
+    def simulate(self, request):
+        key = request["roster"]
+        simulations = positive(request, "simulations", 10000)
+        seed = request.get("seed", 0)
+        engine = request.get("engine", "fast")
+        if engine not in ENGINES:
+            raise ValueError(f"未知引擎: {engine}，可选: {', '.join(ENGINES)}")
+        results = {name: 0 for _, name in get_roster(key)["players"]}
+        args = [(engine, key, chunk_id, n, seed) for chunk_id, n in split_chunks(simulations, self.chunk_size)]
+        for counts in map_chunks(run_chunk, args, 1, self.pool_for(simulations)):
+            merge_results(results, counts)
+        return {"simulations": simulations, "wins": results,
+                "rates": {name: wins / simulations for name, wins in results.items()}}
+
+    def odds(self, request):
+        key = request["roster"]
+        table = self.tables[key] if key in self.tables else compile_roster(get_roster(key))
+        stacks = {int(cell): names for cell, names in request["stacks"].items()}
+        state = make_state(table, stacks, request.get("flags"), request.get("round", 0),
+                           request.get("order"), request.get("slot", 0))
+        simulations = positive(request, "simulations", 10000)
+        wins, samples = query(self.cache, key, state, simulations, positive(request, "max_samples"), 1,
+                              pool=self.pool_for(simulations), chunk_size=self.chunk_size)
+        return {"samples": samples, "wins": dict(zip(table.names, wins)),
+                "rates": {name: w / samples for name, w in zip(table.names, wins)}}
+
+    def close(self):
+        self.pool.shutdown()
+        self.cache.close()
+
+
+class Handler(BaseHTTPRequestHandler):
+    service = None
+    routes = {"/simulate": "simulate", "/odds": "odds"}
+
+    def do_GET(self):
+        if self.path == "/rosters":
+            self.reply(200, {key: [name for _, name in roster["players"]] for key, roster in ROSTERS.items()})
+        else:
+            self.reply(404, {"error": f"未知路径: {self.path}"})
+
+    def do_POST(self):
+        if self.path not in self.routes:
+            self.reply(404, {"error": f"未知路径: {self.path}"})
+            return
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            response = getattr(self.service, self.routes[self.path])(request)
+        except (KeyError, ValueError, TypeError) as e:
+            self.reply(400, {"error": str(e)})
+            return
+        except Exception as e:
+            # 其他异常也回一个 JSON，避免请求线程退出、客户端只看到断开的连接
+            self.reply(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        response["elapsed_ms"] = (time.perf_counter() - start) * 1000
+        self.reply(200, response)
+
+    def reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟服务")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--cache", default=None, help="局面缓存的 sqlite 文件，默认只缓存在内存中")
+    parser.add_argument("--inline-limit", type=int, default=INLINE_LIMIT, help="不超过该场数的查询不经过进程池")
+    args = parser.parse_args()
+
+    Handler.service = Service(args.workers, args.cache, args.inline_limit)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"监听 http://{args.host}:{args.port}（{Handler.service.workers} 个工作进程）", flush=True)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # SIGTERM 与 Ctrl-C 一样关闭服务和进程池
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        Handler.service.close()
@@ -0,0 +1,102 @@
+import argparse
+import time
+
+from engine import play
+from exact_solver import ExactSolver
+from rosters import TRACK_LENGTH, get_roster
+from runner import CHUNK_SIZE, chunk_seed, make_rng, map_chunks, split_chunks
+from skills import compile_roster
+
+# 终局 Rao-Blackwell 估计：正常抽样推进比赛，当某一轮开始时所有团子都已进入终点前 window 格，
+# 改用 exact_solver 计算该局面下各团子的精确获胜概率，按概率给每个团子记分数胜场
+# 精确值是给定该局面时胜者的条件期望，因此估计仍然无偏，而终局的随机性不再贡献方差
+# 精确求解的记忆表在同一进程内跨块复用，常见的终局局面只算一次
+# 技能支持范围与 exact_solver 相同（守岸人、卡卡罗、赞妮、布兰特、洛可可、菲比与无技能团子）
+
+WINDOW = 8
+
+_SOLVERS = {}
+
+
+def get_solver(key, track_length):
+    solver = _SOLVERS.get((key, track_length))
+    if solver is None:
+        solver = _SOLVERS[key, track_length] = ExactSolver(get_roster(key), track_length)
+    return solver
+
+
+def endgame_chunk(key, chunk_id, n, seed, window=WINDOW, track_length=TRACK_LENGTH):
+    # 返回 (各团子的分数胜场之和, 平方和, 转为精确计算的局数)
+    solver = get_solver(key, track_length)
+    table = compile_roster(get_roster(key), track_length=track_length)
+    rng = make_rng(chunk_seed(seed, chunk_id))
+    threshold = track_length - window
+    p = table.n_players
+    credit = [0.0] * p
+    squares = [0.0] * p
+    exact = 0
+
+    def near_finish(game):
+        return game.board.min_cell >= threshold
+
+    for _ in range(n):
+        game = play(table, rng, stop=near_finish)
+        if game.winner is not None:
+            credit[game.winner] += 1
+            squares[game.winner] += 1
+            continue
+        exact += 1
+        board = game.board
+        extra = sum(1 << i for i, e in enumerate(game.next_turn_extra) if e)
+        probs = solver.value(tuple(board.cell), tuple(board.height), extra, solver.full)
+        for i, q in enumerate(probs):
+            credit[i] += q
+            squares[i] += q * q
+    return credit, squares, exact
+
+
+def run_endgame(key, simulations, seed=0, workers=None, window=WINDOW, track_length=TRACK_LENGTH,
+                chunk_size=CHUNK_SIZE):
+    get_solver(key, track_length)  # 不支持的技能在这里报错
+    p = len(get_roster(key)["players"])
+    credit, squares, exact = [0.0] * p, [0.0] * p, 0
+    args = [(key, chunk_id, n, seed, window, track_length) for chunk_id, n in split_chunks(simulations, chunk_size)]
+    for part_credit, part_squares, part_exact in map_chunks(endgame_chunk, args, workers):
+        credit = [a + b for a, b in zip(credit, part_credit)]
+        squares = [a + b for a, b in zip(squares, part_squares)]
+        exact += part_exact
+    return credit, squares, exact
+
+
+def variance_reduction(credit, squares, n):
+    # 普通抽样的方差 p(1-p) 与分数胜场的方差之比
+    out = []
+    for c, s in zip(credit, squares):
+        mean = c / n
+        var = s / n - mean * mean
+        out.append(mean * (1 - mean) / var if var > 0 else float("inf"))
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="终局改用精确计算的低方差胜率估计")
+    parser.add_argument("roster", nargs="?", default="race5")
+    parser.add_argument("-n", "--simulations", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--window", type=int, default=WINDOW, help="所有团子距终点不超过该格数时转为精确计算")
+    parser.add_argument("--track-length", type=int, default=TRACK_LENGTH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    credit, squares, exact = run_endgame(args.roster, args.simulations, args.seed, args.workers,
+                                         args.window, args.track_length)
+    elapsed = time.perf_counter() - start
+
+    n = args.simulations
+    names = [name for _, name in get_roster(args.roster)["players"]]
+    print(f"模拟次数：{n}次，其中 {exact / n * 100:.1f}% 在终局转为精确计算（耗时 {elapsed:.2f}s）")
+    print("胜率（方差缩减 = 普通抽样方差 ÷ 本估计方差）：")
+    rows = zip(names, credit, variance_reduction(credit, squares, n))
+    for name, c, reduction in sorted(rows, key=lambda x: x[1], reverse=True):
+        print(f"{name}: {c / n * 100:.2f}%（方差缩减 {reduction:.2f}x）")
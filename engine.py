@@ -0,0 +1,200 @@
+import argparse
+import random
+import time
+
+from board import Board
+from rosters import TRACK_LENGTH, get_roster
+from runner import print_places
+from skills import compile_roster
+
+# 单局引擎：棋盘用 Board，技能走编译好的挂钩表
+# 没有回合内技能的选手直接掷骰移动；随机数调用顺序与原脚本一致（包括开局堆叠用 shuffle 还是 sample），
+# 同一随机状态下与 race1.py ~ race5.py 逐局得到相同的胜者
+
+
+class Game:
+    def __init__(self, table, rng):
+        n = table.n_players
+        self.table = table
+        self.rng = rng
+        self.params = table.params
+        self.board = Board(n, table.track_length)
+        self.rounds = 0
+        self.turns = 0
+        self.winner = None
+        # 与原脚本中 Player 上的标记同名
+        self.next_turn_extra = [0] * n   # 赞妮
+        self.has_merged = [False] * n    # 坎特蕾拉
+        self.buff_active = [False] * n   # 卡提希娅
+        self.has_triggered = [False] * n  # 卡提希娅
+        self.delay_next_turn = [False] * n  # 长离
+
+    def chance(self, key):
+        return self.rng.random() < self.params[key]
+
+    def trigger(self, event):
+        # 非概率技能生效时调用；默认什么都不做，统计模式下由 instrument.InstrumentedGame 计数
+        pass
+
+    def roll(self, i):
+        hook = self.table.roll[i]
+        return hook(self, i) if hook else self.rng.randint(1, 3)
+
+    def move(self, i, steps, carry_above=True):
+        # 返回到达终点时终点堆叠顶部的团子
+        hook = self.table.move[i]
+        if hook:
+            hook(self, i, steps, carry_above)
+        else:
+            self.board.move(i, steps, carry_above)
+        if self.board.max_cell >= self.board.track_length:
+            return self.board.leader()
+        return None
+
+    def default_turn(self, i, first, last):
+        dice = self.roll(i)
+        bonus = self.table.step_bonus[i]
+        steps = dice + bonus(self, i, dice, first, last) if bonus else dice
+        return self.move(i, steps)
+
+    def take_turn(self, i, first, last):
+        turn = self.table.turn[i]
+        winner = turn(self, i, first, last) if turn else self.default_turn(i, first, last)
+        if winner is None:
+            after_move = self.table.after_move[i]
+            if after_move:
+                after_move(self, i)
+        return winner
+
+
+def start_order(table, rng):
+    # 开局堆叠（底 -> 顶），按阵容对应脚本的抽法：race1 / race2 / race4 为 shuffle，其余为 sample
+    n = table.n_players
+    if table.shuffle_start:
+        order = list(range(n))
+        rng.shuffle(order)
+        return order
+    return rng.sample(range(n), n)
+
+
+def play(table, rng=random, game_cls=Game, stop=None):
+    # 跑完一局并返回 Game，胜者为 game.winner，最终排名为 game.board.ranking()
+    # game_cls 可替换为 Game 的子类（如记录技能判定的 reweight.RecordingGame）
+    game = game_cls(table, rng)
+    game.board.place(start_order(table, rng))
+    return finish(game, stop=stop)
+
+
+def finish(game, order=None, start=0, stop=None):
+    # 从当前局面跑到比赛结束；order 为本轮已确定的行动顺序，从第 start 位继续（见 snapshot.py）
+    # stop(game) 在每轮开始前检查，返回真时提前返回，此时 game.winner 为 None（见 endgame.py）
+    table = game.table
+    rng = game.rng
+    board = game.board
+    n = table.n_players
+    plain = table.plain
+    direct = table.direct
+    rolls = table.roll
+    bonuses = table.step_bonus
+    after_moves = table.after_move
+    randint = rng.randint
+    move = board.move
+    pre_order = table.pre_order
+    after_round = table.after_round
+    track_length = table.track_length
+    last_slot = n - 1
+
+    while True:
+        if order is None:
+            if stop is not None and stop(game):
+                return game
+            game.rounds += 1
+            order = list(range(n))
+            rng.shuffle(order)
+            for i, hook in pre_order:
+                hook(game, i, order)
+            start = 0
+
+        for slot in range(start, n):
+            i = order[slot]
+            if plain[i]:
+                move(i, randint(1, 3))
+                if board.max_cell >= track_length:
+                    game.winner = board.leader()
+                    game.turns = (game.rounds - 1) * n + slot + 1
+                    return game
+            elif direct[i]:
+                # 只有掷骰 / 额外步数 / 移动后挂钩的选手：与 take_turn -> default_turn 相同，省去方法调用链
+                roll = rolls[i]
+                steps = roll(game, i) if roll else randint(1, 3)
+                bonus = bonuses[i]
+                if bonus:
+                    steps += bonus(game, i, steps, slot == 0, slot == last_slot)
+                move(i, steps)
+                if board.max_cell >= track_length:
+                    game.winner = board.leader()
+                    game.turns = (game.rounds - 1) * n + slot + 1
+                    return game
+                after = after_moves[i]
+                if after:
+                    after(game, i)
+            else:
+                winner = game.take_turn(i, slot == 0, slot == last_slot)
+                if winner is not None:
+                    game.winner = winner
+                    game.turns = (game.rounds - 1) * n + slot + 1
+                    return game
+
+        for hook in after_round:
+            hook(game)
+        order = None
+
+
+def simulate_game(table, rng=random):
+    # 返回胜者编号
+    return play(table, rng).winner
+
+
+def run_places(key, simulations, seed=None, params=None, track_length=TRACK_LENGTH):
+    # places[i][r] 为选手 i 获得第 r+1 名的场数
+    table = compile_roster(get_roster(key), params, track_length)
+    rng = random.Random(seed)
+    n = table.n_players
+    places = [[0] * n for _ in range(n)]
+    for _ in range(simulations):
+        for rank, i in enumerate(play(table, rng).board.ranking()):
+            places[i][rank] += 1
+    return table.names, places
+
+
+def run(key, simulations, seed=None, params=None, track_length=TRACK_LENGTH):
+    table = compile_roster(get_roster(key), params, track_length)
+    rng = random.Random(seed)
+    results = {name: 0 for name in table.names}
+    for _ in range(simulations):
+        results[table.names[simulate_game(table, rng)]] += 1
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="单局引擎模拟")
+    parser.add_argument("roster", nargs="?", default="race1")
+    parser.add_argument("-n", "--simulations", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--places", action="store_true", help="输出完整名次分布")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.places:
+        names, places = run_places(args.roster, args.simulations, args.seed)
+        results = {name: row[0] for name, row in zip(names, places)}
+    else:
+        results = run(args.roster, args.simulations, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"模拟次数：{args.simulations}次（耗时 {elapsed:.2f}s）")
+    print("胜率统计：")
+    for name, wins in sorted(results.items(), key=lambda x: x[1], reverse=True):
+        print(f"{name}: {wins}次 ({wins/args.simulations*100:.2f}%)")
+    if args.places:
+        print_places(names, places, args.simulations)
@@ -0,0 +1,260 @@
+import argparse
+import importlib
+import math
+import time
+from collections import defaultdict
+from statistics import NormalDist
+
+from engine import play
+from rosters import ROSTERS, get_roster
+from runner import chunk_seed, make_rng, map_chunks, split_chunks
+from skills import compile_roster
+from tape import TapeRandom, record_chunk, trace
+
+# 等价性检验：原脚本（race1.py ~ race5.py）与候选引擎在每个阵容上是否给出相同的规则语义
+# 1. 分布检验：两边各自独立模拟，比较每个团子的完整名次分布（2 × 人数 列联表），
+#    给出 G 检验与 Pearson 卡方的 p 值，按团子数做 Bonferroni 校正；卡方分布的尾概率用不完全伽马函数计算，不依赖 scipy
+#    场数由 --effect / --power 决定：按单个名次概率的双样本比例检验，保证相差 effect 时以 power 的概率被检出
+# 2. 逐步对比：用 tape.py 录下的同一批磁带分别在引擎和原脚本上重放，每次行动后比较各格堆叠，报告第一处分歧
+# 原脚本只返回胜者，最终堆叠通过 simulate_game 的 stacks 参数取得：传入一个空棋盘，结束后读出
+
+CANDIDATES = ("fast", "alias", "batch")
+CHUNK_SIZE = 5000
+ALPHA = 0.01
+EFFECT = 0.01
+POWER = 0.9
+
+
+# ---------- 卡方分布 ----------
+
+def gamma_q(a, x):
+    # 正则化上不完全伽马函数 Q(a, x)：x < a + 1 用级数，否则用连分式（Lentz）
+    if x <= 0:
+        return 1.0
+    log_prefix = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        term = total = 1 / a
+        k = a
+        while abs(term) > abs(total) * 1e-15:
+            k += 1
+            term *= x / k
+            total += term
+        return max(0.0, 1 - total * math.exp(log_prefix))
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(log_prefix) * h
+
+
+def chi2_sf(statistic, df):
+    return gamma_q(df / 2, statistic / 2)
+
+
+def homogeneity_tests(a, b):
+    # a、b 为两组的各类计数；返回 (G, 卡方, 自由度)，两组都为 0 的类别不计入
+    cols = [(x, y) for x, y in zip(a, b) if x + y]
+    na, nb = sum(a), sum(b)
+    total = na + nb
+    g = chi2 = 0.0
+    for x, y in cols:
+        for observed, n in ((x, na), (y, nb)):
+            expected = n * (x + y) / total
+            chi2 += (observed - expected) ** 2 / expected
+            if observed:
+                g += 2 * observed * math.log(observed / expected)
+    return g, chi2, len(cols) - 1
+
+
+def required_games(n_players, alpha=ALPHA, effect=EFFECT, power=POWER):
+    # 每组场数：双侧比例检验，显著性按 人数 × 名次 个概率做 Bonferroni，方差取最坏情况 p = 0.5
+    z = NormalDist().inv_cdf
+    alpha_cell = alpha / (n_players * n_players)
+    return math.ceil((z(1 - alpha_cell / 2) + z(power)) ** 2 * 2 * 0.25 / effect ** 2)
+
+
+# ---------- 名次分布 ----------
+
+def reference_ranking(stacks, index):
+    # 与 Board.ranking 相同：格子靠前的在前，同格越靠近顶部越靠前
+    return [index[p.name] for cell in sorted(stacks, reverse=True) for p in reversed(stacks[cell])]
+
+
+def reference_places(key, n, seed):
+    module = importlib.import_module(key)
+    players = module.create_players()
+    index = {p.name: i for i, p in enumerate(players)}
+    rng = make_rng(seed)
+    places = [[0] * len(players) for _ in players]
+    for _ in range(n):
+        stacks = defaultdict(list)
+        module.simulate_game(players, rng, stacks)
+        for rank, i in enumerate(reference_ranking(stacks, index)):
+            places[i][rank] += 1
+    return places
+
+
+def engine_places(key, n, seed, alias=False):
+    table = compile_roster(get_roster(key), alias=alias)
+    rng = make_rng(seed)
+    places = [[0] * table.n_players for _ in range(table.n_players)]
+    for _ in range(n):
+        for rank, i in enumerate(play(table, rng).board.ranking()):
+            places[i][rank] += 1
+    return places
+
+
+def batch_places(key, n, seed):
+    import numpy as np
+
+    from batch_engine import simulate_batch
+
+    return simulate_batch(get_roster(key), n, np.random.default_rng(seed)).tolist()
+
+
+def places_chunk(engine, key, chunk_id, n, seed):
+    # 两边用不同的随机流，保证两组样本独立
+    seed = chunk_seed(f"{seed}/{engine}", chunk_id)
+    if engine == "reference":
+        return reference_places(key, n, seed)
+    if engine == "batch":
+        return batch_places(key, n, seed)
+    return engine_places(key, n, seed, alias=engine == "alias")
+
+
+def run_places(engine, key, simulations, seed=0, workers=None, chunk_size=CHUNK_SIZE):
+    total = None
+    args = [(engine, key, chunk_id, n, seed) for chunk_id, n in split_chunks(simulations, chunk_size)]
+    for places in map_chunks(places_chunk, args, workers):
+        total = places if total is None else [[a + b for a, b in zip(r, s)] for r, s in zip(total, places)]
+    return total
+
+
+def compare_places(key, candidate, simulations, seed=0, workers=None, alpha=ALPHA):
+    # 返回 (是否通过, [(名字, G, 卡方, 自由度, G 检验 p 值, 卡方 p 值), ...])
+    names = [name for _, name in get_roster(key)["players"]]
+    other = run_places(candidate, key, simulations, seed, workers)  # 候选引擎不支持该阵容时先报错
+    reference = run_places("reference", key, simulations, seed, workers)
+    rows = []
+    for name, a, b in zip(names, reference, other):
+        g, chi2, df = homogeneity_tests(a, b)
+        rows.append((name, g, chi2, df, chi2_sf(g, df), chi2_sf(chi2, df)))
+    threshold = alpha / len(names)
+    return all(row[4] >= threshold and row[5] >= threshold for row in rows), rows
+
+
+# ---------- 逐步对比 ----------
+
+def stack_names(position_stacks):
+    return tuple((cell, tuple(p.name for p in stack)) for cell, stack in sorted(position_stacks.items()) if stack)
+
+
+def reference_trace(key, tape):
+    # 在原脚本上重放磁带，返回开局与每次行动后的堆叠快照（名字）以及胜者
+    # 快照在下一次 take_turn 之前取，这样 simulate_game 在回合之后调用的技能（如 race1 今汐的 after_move）也包含在内
+    module = importlib.import_module(key)
+    players = module.create_players()
+    stacks = defaultdict(list)
+    snapshots = []
+    for p in players:
+        def take_turn(*args, _turn=p.take_turn, **kwargs):
+            snapshots.append(stack_names(stacks))
+            return _turn(*args, **kwargs)
+        p.take_turn = take_turn
+    winner = module.simulate_game(players, TapeRandom(tape, pad=True), stacks)
+    snapshots.append(stack_names(stacks))
+    return snapshots, winner
+
+
+def engine_trace(table, tape):
+    names = table.names
+    snapshots = []
+    for game, rounds, order, slot, i, snapshot in trace(table, tape):
+        snapshots.append(tuple((cell, tuple(names[p] for p in stack)) for cell, stack in snapshot))
+    return snapshots, names[game.winner]
+
+
+def diff_tape(key, table, tape):
+    # 返回第一处分歧 (第几次行动，0 为开局, 引擎快照, 原脚本快照)，一致时返回 None
+    ours, our_winner = engine_trace(table, tape)
+    theirs, their_winner = reference_trace(key, tape)
+    for move, (a, b) in enumerate(zip(ours, theirs)):
+        if a != b:
+            return move, a, b
+    if len(ours) != len(theirs) or our_winner != their_winner:
+        move = min(len(ours), len(theirs))
+        return (move, ours[move] if move < len(ours) else our_winner,
+                theirs[move] if move < len(theirs) else their_winner)
+    return None
+
+
+def diff_tapes(key, games, seed=0):
+    # 录下 games 局磁带并逐步对比，返回 [(局号, 分歧), ...]
+    table = compile_roster(get_roster(key))
+    diffs = []
+    for game_id, _, tape in record_chunk(key, 0, games, f"{seed}/tapes", 0):
+        diff = diff_tape(key, table, tape)
+        if diff is not None:
+            diffs.append((game_id, diff))
+    return diffs
+
+
+def format_snapshot(snapshot):
+    if isinstance(snapshot, str):
+        return f"胜者 {snapshot}"
+    return "  ".join(f"{cell}:[{'→'.join(stack)}]" for cell, stack in snapshot)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="原脚本与候选引擎的等价性检验")
+    parser.add_argument("rosters", nargs="*", default=None, help="默认检验全部阵容")
+    parser.add_argument("--candidate", choices=CANDIDATES, default="fast")
+    parser.add_argument("-n", "--simulations", type=int, default=None, help="每组场数，默认按 --effect / --power 计算")
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="每个阵容的显著性水平")
+    parser.add_argument("--effect", type=float, default=EFFECT, help="需要检出的名次概率差异")
+    parser.add_argument("--power", type=float, default=POWER)
+    parser.add_argument("--tapes", type=int, default=2000, help="逐步对比的磁带局数，0 为跳过")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    failed = []
+    for key in args.rosters or list(ROSTERS):
+        n_players = len(get_roster(key)["players"])
+        simulations = args.simulations or required_games(n_players, args.alpha, args.effect, args.power)
+        start = time.perf_counter()
+        print(f"== {key}：reference 与 {args.candidate} 各 {simulations} 场")
+        try:
+            ok, rows = compare_places(key, args.candidate, simulations, args.seed, args.workers, args.alpha)
+        except ValueError as e:
+            print(f"  跳过：{e}")
+            continue
+        for name, g, chi2, df, p_g, p_chi2 in rows:
+            print(f"  {name}: G={g:.2f} 卡方={chi2:.2f} 自由度={df} p(G)={p_g:.4f} p(卡方)={p_chi2:.4f}")
+        print(f"  名次分布{'一致' if ok else '不一致'}（Bonferroni 阈值 {args.alpha / n_players:.4f}）")
+        if args.tapes and args.candidate != "batch":
+            diffs = diff_tapes(key, args.tapes, args.seed)
+            print(f"  逐步对比 {args.tapes} 局磁带：{len(diffs)} 局出现分歧")
+            for game_id, (move, ours, theirs) in diffs[:3]:
+                print(f"    第 {game_id} 局第 {move} 次行动后")
+                print(f"      引擎：  {format_snapshot(ours)}")
+                print(f"      原脚本：{format_snapshot(theirs)}")
+            ok = ok and not diffs
+        if not ok:
+            failed.append(key)
+        print(f"  耗时 {time.perf_counter() - start:.1f}s")
+    if failed:
+        raise SystemExit(f"未通过：{', '.join(failed)}")
@@ -0,0 +1,152 @@
+import argparse
+import sys
+import time
+from itertools import permutations
+
+from batch_engine import DICE, check_roster
+from rosters import TRACK_LENGTH, get_roster
+
+# 精确求解：把比赛看成以棋盘状态为节点的马尔可夫链，记忆化求每个状态下各选手的获胜概率
+# 一轮的随机行动顺序等价于每次从本轮尚未行动的选手中等概率选下一个，
+# 因此状态只需记录本轮剩余未行动的选手集合，而不必枚举整条排列
+# 状态：pos / height 为各选手的格子与堆叠高度，extra 为赞妮下回合加成的位掩码，
+# remaining 为本轮尚未行动选手的位掩码；记忆表以打包后的整数为键
+# 每次移动都会让某个团子前进至少一格，状态图无环，递归必然终止
+# 支持的技能与 batch_engine 相同
+
+sys.setrecursionlimit(100000)
+
+
+def dice_outcomes(kind):
+    low, faces, stride = DICE.get(kind, DICE["Player"])
+    return [(low + k * stride, 1 / faces) for k in range(faces)]
+
+
+def move(pos, height, player, steps, track_length):
+    # 自身及上方团子一起移动到新格子顶部，返回 (新 pos, 新 height, 新格子, 新格子上的团子数)
+    cur, h = pos[player], height[player]
+    new_cell = min(cur + steps, track_length)
+    base = pos.count(new_cell)
+    new_pos, new_height = list(pos), list(height)
+    size = base
+    for j, (p, hj) in enumerate(zip(pos, height)):
+        if p == cur and hj >= h:
+            new_pos[j] = new_cell
+            new_height[j] = base + hj - h
+            size += 1
+    return tuple(new_pos), tuple(new_height), new_cell, size
+
+
+class ExactSolver:
+    def __init__(self, roster, track_length=TRACK_LENGTH):
+        check_roster(roster)
+        self.kinds = [kind for kind, _ in roster["players"]]
+        self.names = [name for _, name in roster["players"]]
+        self.n_players = len(self.kinds)
+        self.kakaluo_bottom = roster["rules"] == "race1"
+        self.track_length = track_length
+        self.full = (1 << self.n_players) - 1
+        self.dice = [dice_outcomes(kind) for kind in self.kinds]
+        self.memo = {}
+
+    def encode(self, pos, height, extra, remaining):
+        key = extra << self.n_players | remaining
+        for p, h in zip(pos, height):
+            key = (key << 16) | (p << 4) | h
+        return key
+
+    def unit(self, winner):
+        return tuple(1.0 if j == winner else 0.0 for j in range(self.n_players))
+
+    def bonus_outcomes(self, pos, height, extra, player, first, last):
+        # 骰子以外的加成，返回 [(额外步数, 概率)]
+        kind = self.kinds[player]
+        bonus = 2 if extra >> player & 1 else 0
+        if kind == "BuLanTe" and first:
+            bonus += 2
+        elif kind == "LuoKeKe" and last:
+            bonus += 2
+        elif kind == "KaKaLuo":
+            if pos[player] == min(pos) and (not self.kakaluo_bottom or height[player] == 0):
+                bonus += 3
+        if kind == "FeiBi":
+            return [(bonus, 0.5), (bonus + 1, 0.5)]
+        return [(bonus, 1.0)]
+
+    def turn(self, pos, height, extra, remaining, player):
+        first = remaining == self.full
+        rest = remaining & ~(1 << player)
+        next_remaining = rest or self.full
+        bonuses = self.bonus_outcomes(pos, height, extra, player, first, not rest)
+        is_zanni = self.kinds[player] == "Zanni"
+        if is_zanni:
+            extra &= ~(1 << player)
+
+        result = [0.0] * self.n_players
+        for bonus, p_bonus in bonuses:
+            for dice, p_dice in self.dice[player]:
+                p = p_bonus * p_dice
+                new_pos, new_height, new_cell, size = move(pos, height, player, dice + bonus, self.track_length)
+                if new_cell >= self.track_length:
+                    top = max(range(self.n_players), key=lambda j: (new_pos[j] == new_cell, new_height[j]))
+                    outcomes = [(self.unit(top), 1.0)]
+                elif is_zanni and size > 1:
+                    outcomes = [
+                        (self.value(new_pos, new_height, extra | 1 << player, next_remaining), 0.4),
+                        (self.value(new_pos, new_height, extra, next_remaining), 0.6),
+                    ]
+                else:
+                    outcomes = [(self.value(new_pos, new_height, extra, next_remaining), 1.0)]
+                for probs, p_outcome in outcomes:
+                    for j in range(self.n_players):
+                        result[j] += p * p_outcome * probs[j]
+        return result
+
+    def value(self, pos, height, extra, remaining):
+        key = self.encode(pos, height, extra, remaining)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+        movers = [j for j in range(self.n_players) if remaining >> j & 1]
+        result = [0.0] * self.n_players
+        for player in movers:
+            probs = self.turn(pos, height, extra, remaining, player)
+            for j in range(self.n_players):
+                result[j] += probs[j] / len(movers)
+        result = tuple(result)
+        self.memo[key] = result
+        return result
+
+    def solve(self):
+        # 起点堆叠顺序等概率
+        starts = list(permutations(range(self.n_players)))
+        pos = (0,) * self.n_players
+        result = [0.0] * self.n_players
+        for height in starts:
+            probs = self.value(pos, height, 0, self.full)
+            for j in range(self.n_players):
+                result[j] += probs[j] / len(starts)
+        return dict(zip(self.names, result))
+
+    def states(self):
+        return len(self.memo)
+
+
+def solve(key, track_length=TRACK_LENGTH):
+    return ExactSolver(get_roster(key), track_length).solve()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="精确计算各选手胜率")
+    parser.add_argument("roster", nargs="?", default="race5")
+    parser.add_argument("--track-length", type=int, default=TRACK_LENGTH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    solver = ExactSolver(get_roster(args.roster), args.track_length)
+    results = solver.solve()
+    elapsed = time.perf_counter() - start
+
+    print(f"精确胜率（{solver.states()} 个状态，耗时 {elapsed:.2f}s）：")
+    for name, p in sorted(results.items(), key=lambda x: x[1], reverse=True):
+        print(f"{name}: {p*100:.4f}%")
@@ -0,0 +1,137 @@
+from collections import Counter
+from time import perf_counter_ns
+
+from engine import Game, start_order
+from rosters import get_roster
+from runner import CHUNK_SIZE, chunk_seed, make_rng, map_chunks, split_chunks
+from skills import compile_roster
+
+# 可选的统计模式：技能触发计数 + 各阶段计时
+# 关闭时引擎走 engine.play，不做任何额外工作；确定性技能的 game.trigger 是空方法，只在技能生效时调用
+# 打开时改用 play_instrumented：挂钩表与 fast 引擎相同（不启用别名表），每次 game.chance 判定都会计数；
+# 所有选手都走 take_turn，以便逐阶段计时，规则与 engine.play 相同
+# 阶段：determine_order（洗牌 + 排序挂钩）、take_turn（整个回合，含移动）、move（Board.move 或移动挂钩）、
+#       finish_scan（终点判定）
+
+PHASES = ("determine_order", "take_turn", "move", "finish_scan")
+
+
+class Stats:
+    def __init__(self):
+        self.games = 0
+        self.turns = 0
+        self.triggers = Counter()   # 技能生效次数
+        self.checks = Counter()     # 概率技能的判定次数
+        self.phase_ns = Counter()
+        self.phase_calls = Counter()
+
+    def add(self, phase, ns):
+        self.phase_ns[phase] += ns
+        self.phase_calls[phase] += 1
+
+    def merge(self, other):
+        self.games += other.games
+        self.turns += other.turns
+        self.triggers.update(other.triggers)
+        self.checks.update(other.checks)
+        self.phase_ns.update(other.phase_ns)
+        self.phase_calls.update(other.phase_calls)
+        return self
+
+    def report(self):
+        print(f"技能触发（{self.games} 场，{self.turns} 步）：")
+        for event, hits in sorted(self.triggers.items()):
+            rate = f"，判定命中率 {hits / self.checks[event] * 100:.2f}%" if self.checks[event] else ""
+            print(f"  {event}: {hits}次，每场 {hits / self.games:.3f}次{rate}")
+        print("阶段耗时（take_turn 包含 move 与 finish_scan）：")
+        for phase in PHASES:
+            calls = self.phase_calls[phase]
+            if calls:
+                total = self.phase_ns[phase]
+                print(f"  {phase}: {total / 1e9:.3f}s，{calls}次，平均 {total / calls:.0f}ns")
+
+
+class InstrumentedGame(Game):
+    def __init__(self, table, rng, stats):
+        super().__init__(table, rng)
+        self.stats = stats
+
+    def chance(self, key):
+        hit = self.rng.random() < self.params[key]
+        self.stats.checks[key] += 1
+        if hit:
+            self.stats.triggers[key] += 1
+        return hit
+
+    def trigger(self, event):
+        self.stats.triggers[event] += 1
+
+    def move(self, i, steps, carry_above=True):
+        board = self.board
+        t0 = perf_counter_ns()
+        hook = self.table.move[i]
+        if hook:
+            hook(self, i, steps, carry_above)
+        else:
+            board.move(i, steps, carry_above)
+        t1 = perf_counter_ns()
+        winner = board.leader() if board.max_cell >= board.track_length else None
+        t2 = perf_counter_ns()
+        self.stats.add("move", t1 - t0)
+        self.stats.add("finish_scan", t2 - t1)
+        return winner
+
+
+def play_instrumented(table, rng, stats):
+    # 与 engine.play 相同的流程，所有选手都走 take_turn 以便计时
+    game = InstrumentedGame(table, rng, stats)
+    board = game.board
+    n = table.n_players
+    last_slot = n - 1
+
+    board.place(start_order(table, rng))
+    while True:
+        game.rounds += 1
+        t0 = perf_counter_ns()
+        order = list(range(n))
+        rng.shuffle(order)
+        for i, hook in table.pre_order:
+            hook(game, i, order)
+        stats.add("determine_order", perf_counter_ns() - t0)
+
+        for slot, i in enumerate(order):
+            t0 = perf_counter_ns()
+            winner = game.take_turn(i, slot == 0, slot == last_slot)
+            stats.add("take_turn", perf_counter_ns() - t0)
+            if winner is not None:
+                game.winner = winner
+                game.turns = (game.rounds - 1) * n + slot + 1
+                stats.games += 1
+                stats.turns += game.turns
+                return game
+
+        for hook in table.after_round:
+            hook(game)
+
+
+def instrumented_chunk(key, chunk_id, n, seed):
+    # 与 fast 引擎同一张挂钩表：菲比、卡提希娅等的额外步数判定逐次经过 game.chance，才能计数
+    table = compile_roster(get_roster(key))
+    rng = make_rng(chunk_seed(seed, chunk_id))
+    stats = Stats()
+    results = Counter()
+    for _ in range(n):
+        results[table.names[play_instrumented(table, rng, stats).winner]] += 1
+    return results, stats
+
+
+def run_instrumented(key, simulations, seed=0, workers=None, chunk_size=CHUNK_SIZE):
+    # 按块并行，结果与统计按块编号顺序合并
+    results = {name: 0 for _, name in get_roster(key)["players"]}
+    stats = Stats()
+    args = [(key, chunk_id, n, seed) for chunk_id, n in split_chunks(simulations, chunk_size)]
+    for counts, chunk_stats in map_chunks(instrumented_chunk, args, workers):
+        for name, wins in counts.items():
+            results[name] += wins
+        stats.merge(chunk_stats)
+    return results, stats
@@ -0,0 +1,241 @@
+import argparse
+import json
+import math
+import os
+import time
+import tomllib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from statistics import NormalDist
+
+from engine import simulate_game
+from rosters import TRACK_LENGTH, get_roster, make_roster
+from runner import CHUNK_SIZE, MAX_SIMULATIONS, chunk_seed, confidence_halfwidths, make_rng, map_chunks
+from skills import DEFAULT_PARAMS, compile_roster
+
+# 场景清单批量运行：一个清单（JSON 或 TOML）列出多个场景，统一调度到本地进程池，结果写入同一个文件
+# 场景字段：name、roster（阵容名）或 rules + players、params（技能概率）、track_length、
+#           simulations（固定场数）或 precision（胜率置信区间半宽，百分点）；顶层的同名字段作为默认值
+# simulations 与 precision 先看场景自身，场景都没给时再看顶层：场景的 precision 优先于顶层的 simulations
+# 完全相同的场景（规则、阵容、参数、赛道长度一致）只跑一次，场数取各自要求中最严的；
+# 参数只比较阵容实际读取的那些（技能概率以技能类型命名，只有阵容中出现的类型会被读取）
+# 开销估计：每局 人数 × 预计轮数（赛道长度 / 2，平均每轮前进约 2 格），每块的场数按开销折算，使各块耗时大致相同，
+# 但不超过 runner.CHUNK_SIZE；
+# 每一批按块开销从大到小提交（LPT），进程池里最后只剩小块
+# 按精度停止的场景先跑一批试探，用试探的胜率估算所需场数，只补差额（向上取整到 TOPUP_STEP 的倍数）；
+# 仍未达到时按新的估计再补
+# 各场景每块的随机流由 (seed, 场景, 块编号) 派生，结果与进程数无关
+
+DEFAULT_PRECISION = 0.5  # 百分点
+CONFIDENCE = 0.95
+CHUNK_COST = 2_000_000   # 每块的预估开销：场数 × 人数 × 预计轮数
+PILOT = 5000
+TOPUP_STEP = 1000        # 补齐场数的取整单位
+MARGIN = 1.1
+
+
+def load_manifest(path):
+    if path.endswith(".toml"):
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def normalize_scenario(scenario, defaults, index):
+    # 返回补全后的场景；key 为去重用的规范编码
+    s = {**defaults, **scenario}
+    if "roster" in s:
+        roster = get_roster(s["roster"])
+    elif "players" in s:
+        roster = make_roster([tuple(p) for p in s["players"]], s.get("rules", "race3"))
+    else:
+        raise ValueError(f"场景 {index} 缺少 roster 或 players")
+    params = dict(s.get("params", {}))
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"未知参数: {', '.join(sorted(unknown))}，可选: {', '.join(DEFAULT_PARAMS)}")
+    track_length = int(s.get("track_length", TRACK_LENGTH))
+    roster = {"rules": roster["rules"], "players": [tuple(p) for p in roster["players"]]}
+    kinds = {kind for kind, _ in roster["players"]}
+    used = {k: v for k, v in {**DEFAULT_PARAMS, **params}.items() if k in kinds}
+    key = json.dumps({"rules": roster["rules"], "players": roster["players"],
+                      "params": used, "track_length": track_length},
+                     ensure_ascii=False, sort_keys=True)
+    if "simulations" in scenario or "precision" in scenario:
+        source = scenario
+    else:
+        source = defaults
+    if "simulations" in source:
+        simulations, precision = int(source["simulations"]), None
+        if simulations <= 0:
+            raise ValueError(f"场景 {index} 的 simulations 必须为正数")
+    else:
+        simulations, precision = None, float(source.get("precision", DEFAULT_PRECISION))
+        if precision <= 0:
+            raise ValueError(f"场景 {index} 的 precision 必须为正数")
+    return {
+        "name": s.get("name", s.get("roster", f"场景{index}")),
+        "roster": roster,
+        "params": params,
+        "track_length": track_length,
+        "simulations": simulations,
+        "precision": precision,
+        "key": key,
+    }
+
+
+def load_scenarios(manifest):
+    defaults = {k: v for k, v in manifest.items() if k not in ("scenario", "scenarios", "seed", "confidence", "name")}
+    items = manifest.get("scenario", manifest.get("scenarios", []))
+    scenarios = [normalize_scenario(s, defaults, i) for i, s in enumerate(items)]
+    names = [s["name"] for s in scenarios]
+    if len(set(names)) != len(names):
+        raise ValueError("场景名重复，请用 name 区分")
+    return scenarios
+
+
+def dedupe(scenarios):
+    # 相同 key 的场景合并为一个任务：固定场数取最大，精度取最小
+    jobs = {}
+    for s in scenarios:
+        job = jobs.get(s["key"])
+        if job is None:
+            job = jobs[s["key"]] = {
+                "key": s["key"], "roster": s["roster"], "params": s["params"], "track_length": s["track_length"],
+                "simulations": 0, "precision": None, "names": [],
+            }
+        job["names"].append(s["name"])
+        if s["simulations"] is not None:
+            job["simulations"] = max(job["simulations"], s["simulations"])
+        else:
+            job["precision"] = s["precision"] if job["precision"] is None else min(job["precision"], s["precision"])
+    return list(jobs.values())
+
+
+def game_cost(job):
+    return len(job["roster"]["players"]) * job["track_length"] / 2
+
+
+def chunk_games(job):
+    return max(1, min(CHUNK_SIZE, int(CHUNK_COST / game_cost(job))))
+
+
+def required_simulations(wins, simulations, precision, confidence=CONFIDENCE):
+    # 用已有胜率估算达到 precision（百分点）所需的总场数，取最接近 50% 的选手
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / (2 * len(wins)))
+    worst = max(max(w / simulations * (1 - w / simulations) for w in wins), 1 / simulations)
+    return math.ceil(z * z * worst / (precision / 100) ** 2 * MARGIN)
+
+
+def scenario_chunk(roster, params, track_length, n, seed):
+    table = compile_roster(roster, params, track_length)
+    rng = make_rng(seed)
+    wins = [0] * table.n_players
+    for _ in range(n):
+        wins[simulate_game(table, rng)] += 1
+    return wins
+
+
+def plan(jobs, state, targets, seed):
+    # 本批要跑的块：(开销, 任务下标, 场数, 参数)，按开销从大到小；块编号在这里推进，与完成顺序无关
+    tasks = []
+    for j, job in enumerate(jobs):
+        done, chunks = state[j]["simulations"], state[j]["chunks"]
+        size = chunk_games(job)
+        remaining = targets[j] - done
+        while remaining > 0:
+            n = min(size, remaining)
+            args = (job["roster"], job["params"], job["track_length"], n, chunk_seed(f"{seed}/{job['key']}", chunks))
+            tasks.append((n * game_cost(job), j, n, args))
+            chunks += 1
+            remaining -= n
+        state[j]["chunks"] = chunks
+    tasks.sort(key=lambda t: t[0], reverse=True)
+    return tasks
+
+
+def run_jobs(jobs, seed=0, workers=None, confidence=CONFIDENCE, max_simulations=MAX_SIMULATIONS, progress=None):
+    workers = workers or os.cpu_count() or 1
+    state = [{"wins": [0] * len(job["roster"]["players"]), "simulations": 0, "chunks": 0} for job in jobs]
+    targets = [max(job["simulations"], PILOT if job["precision"] else 0) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as pool:
+        while True:
+            tasks = plan(jobs, state, targets, seed)
+            if not tasks:
+                break
+            if progress:
+                progress(tasks)
+            for (_, j, n, _), wins in zip(tasks, map_chunks(scenario_chunk, [t[3] for t in tasks], 1, pool)):
+                state[j]["wins"] = [a + b for a, b in zip(state[j]["wins"], wins)]
+                state[j]["simulations"] += n
+            for j, job in enumerate(jobs):
+                done = state[j]["simulations"]
+                if job["precision"] is None or done >= max_simulations:
+                    continue
+                results = dict(enumerate(state[j]["wins"]))
+                if max(confidence_halfwidths(results, done, confidence).values()) * 100 > job["precision"]:
+                    need = required_simulations(state[j]["wins"], done, job["precision"], confidence)
+                    topup = math.ceil(max(need - done, 1) / TOPUP_STEP) * TOPUP_STEP
+                    targets[j] = min(done + topup, max_simulations)
+    return state
+
+
+def write_results(path, scenarios, jobs, state, confidence=CONFIDENCE):
+    # 所有场景写入同一个 JSON；去重合并的场景各自一份，same_as 指向实际运行的第一个场景
+    index = {job["key"]: j for j, job in enumerate(jobs)}
+    out = {}
+    for s in scenarios:
+        j = index[s["key"]]
+        job, result = jobs[j], state[j]
+        names = [name for _, name in job["roster"]["players"]]
+        n = result["simulations"]
+        halfwidths = confidence_halfwidths(dict(zip(names, result["wins"])), n, confidence)
+        entry = {
+            "rules": job["roster"]["rules"],
+            "players": names,
+            "params": {**DEFAULT_PARAMS, **job["params"]},
+            "track_length": job["track_length"],
+            "simulations": n,
+            "wins": dict(zip(names, result["wins"])),
+            "rates": {name: w / n for name, w in zip(names, result["wins"])},
+            "halfwidths": halfwidths,
+        }
+        if job["names"][0] != s["name"]:
+            entry["same_as"] = job["names"][0]
+        out[s["name"]] = entry
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(out, f, ensure_ascii=False, indent=2)
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按场景清单批量模拟")
+    parser.add_argument("manifest", help="场景清单，.json 或 .toml")
+    parser.add_argument("--seed", type=int, default=None, help="默认取清单中的 seed，没有时为 0")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("-o", "--output", default="manifest_results.json")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    seed = args.seed if args.seed is not None else manifest.get("seed", 0)
+    confidence = manifest.get("confidence", CONFIDENCE)
+    scenarios = load_scenarios(manifest)
+    jobs = dedupe(scenarios)
+    print(f"{len(scenarios)} 个场景，去重后 {len(jobs)} 个")
+
+    def progress(tasks):
+        cost = sum(t[0] for t in tasks)
+        print(f"  提交 {len(tasks)} 块，{sum(t[2] for t in tasks)} 场，预估开销 {cost:.3g}")
+
+    start = time.perf_counter()
+    state = run_jobs(jobs, seed, args.workers, confidence, progress=progress)
+    results = write_results(args.output, scenarios, jobs, state, confidence)
+    elapsed = time.perf_counter() - start
+
+    for name, entry in results.items():
+        n = entry["simulations"]
+        best = max(entry["rates"], key=entry["rates"].get)
+        width = max(entry["halfwidths"].values()) * 100
+        print(f"{name}: {n} 场，最高胜率 {best} {entry['rates'][best] * 100:.2f}%（±{width:.2f}）")
+    print(f"结果写入 {args.output}（耗时 {elapsed:.1f}s）")
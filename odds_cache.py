@@ -0,0 +1,143 @@
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from rosters import TRACK_LENGTH, get_roster
+from runner import CHUNK_SIZE
+from skills import DEFAULT_PARAMS, RULES_VERSION, compile_roster
+from snapshot import conditional_wins, make_state, parse_flags, parse_stacks
+
+# 局面 -> 条件胜率的缓存：内存中 LRU，磁盘上 sqlite
+# 键为局面的规范编码：阵容（技能类型 + 规则）、快照、技能参数、赛道长度、RULES_VERSION
+# 值为各团子的胜场与样本数；同一局面再次查询时在已有样本上追加新的一批，而不是重新开始
+# 每批的随机种子由 (键, 已有样本数) 派生，追加的样本与之前的互不重复
+# 同一局面的 读取 -> 追加 -> 写回 在该键的锁内完成，并发查询依次追加，不会用同一种子重复计算或互相覆盖
+
+CAPACITY = 1024
+CACHE_FILE = "odds_cache.sqlite"
+
+
+def state_key(key, state, params=None, track_length=TRACK_LENGTH):
+    roster = get_roster(key)
+    return json.dumps({
+        "version": RULES_VERSION,
+        "rules": roster["rules"],
+        "kinds": [kind for kind, _ in roster["players"]],
+        "params": {**DEFAULT_PARAMS, **(params or {})},
+        "track_length": track_length,
+        "state": state,
+    }, separators=(",", ":"), sort_keys=True)
+
+
+class OddsCache:
+    def __init__(self, path=None, capacity=CAPACITY):
+        # path 为 None 时只用内存
+        self.capacity = capacity
+        self.memory = OrderedDict()
+        # 允许多个线程共用（daemon.py），读写都在锁内
+        self.lock = threading.Lock()
+        self.key_locks = {}  # 键 -> [锁, 等待与持有的线程数]，无人使用时删除
+        self.db = sqlite3.connect(path, check_same_thread=False) if path else None
+        if self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS odds (key TEXT PRIMARY KEY, wins TEXT, samples INTEGER)")
+
+    def get(self, key):
+        # 返回 (胜场列表, 样本数)，未缓存时为 None
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+            if self.db:
+                row = self.db.execute("SELECT wins, samples FROM odds WHERE key = ?", (key,)).fetchone()
+                if row:
+                    entry = (json.loads(row[0]), row[1])
+                    self._remember(key, entry)
+                    return entry
+        return None
+
+    def put(self, key, wins, samples):
+        entry = (list(wins), samples)
+        with self.lock:
+            self._remember(key, entry)
+            if self.db:
+                self.db.execute("INSERT OR REPLACE INTO odds VALUES (?, ?, ?)", (key, json.dumps(entry[0]), samples))
+                self.db.commit()
+
+    @contextmanager
+    def locked(self, key):
+        # 独占一个键：期间其他线程对同一键的 locked 会等待
+        with self.lock:
+            entry = self.key_locks.get(key)
+            if entry is None:
+                entry = self.key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.key_locks[key]
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+    def close(self):
+        if self.db:
+            self.db.close()
+
+
+def query(cache, key, state, simulations, max_samples=None, workers=None, params=None, track_length=TRACK_LENGTH,
+          pool=None, chunk_size=CHUNK_SIZE):
+    # 返回 (胜场列表, 样本数)；已缓存的样本数达到 max_samples 时直接返回，否则追加 simulations 局
+    cache_key = state_key(key, state, params, track_length)
+    with cache.locked(cache_key):
+        cached = cache.get(cache_key)
+        wins, samples = cached or ([0] * len(get_roster(key)["players"]), 0)
+        if max_samples is not None and samples >= max_samples:
+            return wins, samples
+        if max_samples is not None:
+            simulations = min(simulations, max_samples - samples)
+        seed = f"{cache_key}/{samples}"
+        new = conditional_wins(key, state, simulations, seed, workers, params, track_length, chunk_size, pool)
+        wins = [a + b for a, b in zip(wins, new)]
+        samples += simulations
+        cache.put(cache_key, wins, samples)
+    return wins, samples
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="带缓存的中途局面条件胜率")
+    parser.add_argument("roster", help="阵容，如 race1 ~ race5")
+    parser.add_argument("--stack", nargs="+", required=True, metavar="CELL:NAMES", help="每格的堆叠，底 -> 顶")
+    parser.add_argument("--flag", nargs="*", default=[], metavar="NAME.FLAG=VALUE")
+    parser.add_argument("--round", type=int, default=0)
+    parser.add_argument("--order", default=None)
+    parser.add_argument("--slot", type=int, default=0)
+    parser.add_argument("-n", "--simulations", type=int, default=20000, help="本次追加的模拟次数")
+    parser.add_argument("--max-samples", type=int, default=None, help="样本数达到该值后不再追加")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--cache", default=CACHE_FILE)
+    args = parser.parse_args()
+
+    table = compile_roster(get_roster(args.roster))
+    order = args.order.split(",") if args.order else None
+    state = make_state(table, parse_stacks(args.stack), parse_flags(args.flag), args.round, order, args.slot)
+
+    cache = OddsCache(args.cache)
+    start = time.perf_counter()
+    wins, samples = query(cache, args.roster, state, args.simulations, args.max_samples, args.workers)
+    elapsed = time.perf_counter() - start
+    cache.close()
+
+    print(f"累计样本 {samples} 局（本次耗时 {elapsed:.2f}s）")
+    for name, w in sorted(zip(table.names, wins), key=lambda x: x[1], reverse=True):
+        print(f"{name}: {w / samples * 100:.2f}%")
@@ -4,6 +4,7 @@ from collections import defaultdict
 class Player:
     def __init__(self, name):
         self.name = name
+        self.rng = random  # 随机源，由 simulate_game 注入
         self.position = 0
         self.reached = False
     
@@ -12,7 +13,7 @@ class Player:
         self.reached = False
     
     def roll_dice(self):
-        return random.randint(1, 3)
+        return self.rng.randint(1, 3)
     
     def take_turn(self, position_stacks, players):
         if self.reached:
@@ -64,7 +65,7 @@ class JinXi(Player):
         current_pos = self.position
         stack = position_stacks.get(current_pos, [])
         if self in stack and stack.index(self) < len(stack)-1:
-            if random.random() < 0.4:
+            if self.rng.random() < 0.4:
                 stack.remove(self)
                 stack.append(self)
 
@@ -73,7 +74,7 @@ class KeLaiTa(Player):
         if self.reached:
             return None
         
-        if random.random() < 0.28:
+        if self.rng.random() < 0.28:
             dice = self.roll_dice()  # 只投掷一次骰子
             for _ in range(2):
                 winner = self.move(dice, position_stacks)
@@ -90,7 +91,7 @@ class Chun(Player):
         if self.reached:
             return None
         
-        if random.random() < 0.5:
+        if self.rng.random() < 0.5:
             current_pos = self.position
             stack = position_stacks.get(current_pos, [])
             others = len(stack) - 1
@@ -102,7 +103,7 @@ class Chun(Player):
 
 class ShouAnRen(Player):
     def roll_dice(self):
-        return random.choice([2, 3])
+        return self.rng.choice([2, 3])
 
 class KaKaLuo(Player):
     def take_turn(self, position_stacks, players):
@@ -126,30 +127,33 @@ class KaKaLuo(Player):
 class ChangLi(Player):
     pass
 
-def determine_order(players, position_stacks):
+def determine_order(players, position_stacks, rng=random):
     active_players = [p for p in players if not p.reached]
     order = active_players.copy()
-    random.shuffle(order)
+    rng.shuffle(order)
     
     # 处理长离技能
     changli_players = [p for p in order if isinstance(p, ChangLi)]
     for p in changli_players:
         stack = position_stacks.get(p.position, [])
         if p in stack and stack.index(p) > 0:
-            if random.random() < 0.65:
+            if rng.random() < 0.65:
                 order.remove(p)
                 order.append(p)
                 break
     
     return order
 
-def simulate_game(players):
+def simulate_game(players, rng=random, stacks=None):
+    # rng 为随机源，默认全局 random 模块；也可传入 random.Random 或 rng.BufferedRandom
+    # stacks 可传入一个空的 defaultdict(list) 作为棋盘，结束后即为最终堆叠（equivalence.py 用来取名次）
     for p in players:
         p.reset()
+        p.rng = rng
     
-    position_stacks = defaultdict(list)
+    position_stacks = defaultdict(list) if stacks is None else stacks
     position_stacks[0] = players.copy()
-    random.shuffle(position_stacks[0])
+    rng.shuffle(position_stacks[0])
     
     for p in players:
         p.position = 0
@@ -166,7 +170,7 @@ def simulate_game(players):
             break
         
         # 确定行动顺序
-        order = determine_order(active_players, position_stacks)
+        order = determine_order(active_players, position_stacks, rng)
         
         # 执行回合
         for player in order:
@@ -190,27 +194,31 @@ def simulate_game(players):
     return None
 
 # 初始化选手
-players = [
-    JinXi("今汐"),
-    KeLaiTa("珂莱塔"),
-    Chun("椿"),
-    ShouAnRen("守岸人"),
-    KaKaLuo("卡卡罗"),
-    ChangLi("长离")
-]
+def create_players():
+    return [
+        JinXi("今汐"),
+        KeLaiTa("珂莱塔"),
+        Chun("椿"),
+        ShouAnRen("守岸人"),
+        KaKaLuo("卡卡罗"),
+        ChangLi("长离")
+    ]
 
-# 模拟参数
-simulations = 10000 # 模拟次数
-results = {p.name: 0 for p in players}
-
-# 运行模拟
-for _ in range(simulations):
-    winner = simulate_game(players)
-    if winner:
-        results[winner] += 1
-
-# 输出结果
-print(f"模拟次数：{simulations}次")
-print("胜率统计：")
-for name, wins in results.items():
-    print(f"{name}: {wins}次 ({wins/simulations*100:.2f}%)")
\ No newline at end of file
+if __name__ == "__main__":
+    players = create_players()
+    
+    # 模拟参数
+    simulations = 10000 # 模拟次数
+    results = {p.name: 0 for p in players}
+    
+    # 运行模拟
+    for _ in range(simulations):
+        winner = simulate_game(players)
+        if winner:
+            results[winner] += 1
+    
+    # 输出结果
+    print(f"模拟次数：{simulations}次")
+    print("胜率统计：")
+    for name, wins in results.items():
+        print(f"{name}: {wins}次 ({wins/simulations*100:.2f}%)")
\ No newline at end of file
@@ -4,6 +4,7 @@ from collections import defaultdict
 class Player:
     def __init__(self, name):
         self.name = name
+        self.rng = random  # 随机源，由 simulate_game 注入
         self.position = 0
         self.reached = False
         self.reset()
@@ -17,7 +18,7 @@ class Player:
         self.has_triggered = False  # 用于卡提希娅的触发标记
     
     def roll_dice(self):
-        return random.randint(1, 3)
+        return self.rng.randint(1, 3)
     
     def move(self, steps, position_stacks, carry_above=True):
         if self.reached:
@@ -60,7 +61,7 @@ class FeiBi(Player):
             return None
         
         dice = self.roll_dice()
-        steps = dice + (1 if random.random() < 0.5 else 0)
+        steps = dice + (1 if self.rng.random() < 0.5 else 0)
         return self.move(steps, position_stacks)
 
 class KaTiXiYa(Player):
@@ -70,7 +71,7 @@ class KaTiXiYa(Player):
         
         # 基础移动
         dice = self.roll_dice()
-        steps = dice + (2 if self.buff_active and random.random() < 0.6 else 0)
+        steps = dice + (2 if self.buff_active and self.rng.random() < 0.6 else 0)
         winner = self.move(steps, position_stacks)
         
         # 检查是否触发技能
@@ -86,7 +87,7 @@ class KaTiXiYa(Player):
 
 class Zanni(Player):
     def roll_dice(self):
-        return random.choice([1, 3])
+        return self.rng.choice([1, 3])
     
     def take_turn(self, position_stacks, players, is_first=False, is_last=False):
         # 应用额外步数
@@ -99,7 +100,7 @@ class Zanni(Player):
         current_pos = self.position
         stack = position_stacks.get(current_pos, [])
         if len(stack) > 1 and self in stack:
-            if random.random() < 0.4:
+            if self.rng.random() < 0.4:
                 self.next_turn_extra = 2
         
         return winner
@@ -170,19 +171,22 @@ class LuoKeKe(Player):
         steps = dice + (2 if is_last else 0)
         return self.move(steps, position_stacks)
 
-def determine_order(players, position_stacks):
+def determine_order(players, position_stacks, rng=random):
     active_players = [p for p in players if not p.reached]
     order = active_players.copy()
-    random.shuffle(order)
+    rng.shuffle(order)
     return order
 
-def simulate_game(players):
+def simulate_game(players, rng=random, stacks=None):
+    # rng 为随机源，默认全局 random 模块；也可传入 random.Random 或 rng.BufferedRandom
+    # stacks 可传入一个空的 defaultdict(list) 作为棋盘，结束后即为最终堆叠（equivalence.py 用来取名次）
     for p in players:
         p.reset()
+        p.rng = rng
     
-    position_stacks = defaultdict(list)
+    position_stacks = defaultdict(list) if stacks is None else stacks
     position_stacks[0] = players.copy()
-    random.shuffle(position_stacks[0])
+    rng.shuffle(position_stacks[0])
     
     for p in players:
         p.position = 0
@@ -197,7 +201,7 @@ def simulate_game(players):
         if not active_players:
             break
         
-        order = determine_order(active_players, position_stacks)
+        order = determine_order(active_players, position_stacks, rng)
         
         for index, player in enumerate(order):
             is_first = (index == 0)
@@ -209,27 +213,31 @@ def simulate_game(players):
     return None
 
 # 初始化B组选手
-players = [
-    FeiBi("菲比"),
-    KaTiXiYa("卡提希娅"),
-    Zanni("赞妮"),
-    KanTeLeiLa("坎特蕾拉"),
-    BuLanTe("布兰特"),
-    LuoKeKe("洛可可")
-]
+def create_players():
+    return [
+        FeiBi("菲比"),
+        KaTiXiYa("卡提希娅"),
+        Zanni("赞妮"),
+        KanTeLeiLa("坎特蕾拉"),
+        BuLanTe("布兰特"),
+        LuoKeKe("洛可可")
+    ]
 
-# 模拟参数
-simulations = 100000 # 模拟次数
-results = {p.name: 0 for p in players}
-
-# 运行模拟
-for _ in range(simulations):
-    winner = simulate_game(players)
-    if winner:
-        results[winner] += 1
-
-# 输出结果
-print(f"模拟次数：{simulations}次")
-print("胜率统计：")
-for name, wins in sorted(results.items(), key=lambda x: x[1], reverse=True):
-    print(f"{name}: {wins}次 ({wins/simulations*100:.2f}%)")
\ No newline at end of file
+if __name__ == "__main__":
+    players = create_players()
+    
+    # 模拟参数
+    simulations = 100000 # 模拟次数
+    results = {p.name: 0 for p in players}
+    
+    # 运行模拟
+    for _ in range(simulations):
+        winner = simulate_game(players)
+        if winner:
+            results[winner] += 1
+    
+    # 输出结果
+    print(f"模拟次数：{simulations}次")
+    print("胜率统计：")
+    for name, wins in sorted(results.items(), key=lambda x: x[1], reverse=True):
+        print(f"{name}: {wins}次 ({wins/simulations*100:.2f}%)")
\ No newline at end of file
@@ -6,6 +6,7 @@ TRACK_LENGTH = 24  # 修改赛道长度为24步
 class Player:
     def __init__(self, name):
         self.name = name
+        self.rng = random  # 随机源，由 simulate_game 注入
         self.position = 0
         self.reached = False
         self.reset()
@@ -16,7 +17,7 @@ class Player:
         self.delay_next_turn = False  # 用于长离的延迟标记
     
     def roll_dice(self):
-        return random.randint(1, 3)
+        return self.rng.randint(1, 3)
     
     def move(self, steps, position_stacks, carry_above=True):
         if self.reached:
@@ -69,13 +70,13 @@ class JinXi(Player):
         stack = position_stacks.get(current_pos, [])
         if len(stack) > 1 and self in stack:
             # 检查是否不在最上层
-            if stack[-1] != self and random.random() < 0.4:
+            if stack[-1] != self and self.rng.random() < 0.4:
                 stack.remove(self)
                 stack.append(self)
 
 class ShouAnRen(Player):
     def roll_dice(self):
-        return random.choice([2, 3])
+        return self.rng.choice([2, 3])
 
 class KaKaLuo(Player):
     def take_turn(self, position_stacks, players, is_first=False, is_last=False):
@@ -98,13 +99,13 @@ class ChangLi(Player):
         stack = position_stacks.get(current_pos, [])
         # 检查是否在堆叠上方
         if stack and self in stack and stack.index(self) > 0:
-            self.delay_next_turn = random.random() < 0.65
+            self.delay_next_turn = self.rng.random() < 0.65
 
 # ------------ 模拟逻辑 ------------
-def determine_order(active_players, position_stacks):
+def determine_order(active_players, position_stacks, rng=random):
     # 先随机打乱顺序
     order = active_players.copy()
-    random.shuffle(order)
+    rng.shuffle(order)
     
     # 处理长离的延迟
     for p in order:
@@ -116,12 +117,15 @@ def determine_order(active_players, position_stacks):
     
     return order
 
-def simulate_game(players):
+def simulate_game(players, rng=random, stacks=None):
+    # rng 为随机源，默认全局 random 模块；也可传入 random.Random 或 rng.BufferedRandom
+    # stacks 可传入一个空的 defaultdict(list) 作为棋盘，结束后即为最终堆叠（equivalence.py 用来取名次）
     for p in players:
         p.reset()
+        p.rng = rng
     
-    position_stacks = defaultdict(list)
-    position_stacks[0] = random.sample(players, k=len(players))
+    position_stacks = defaultdict(list) if stacks is None else stacks
+    position_stacks[0] = rng.sample(players, k=len(players))
     
     while True:
         # 检查终点
@@ -133,7 +137,7 @@ def simulate_game(players):
         if not active_players:
             break
         
-        order = determine_order(active_players, position_stacks)
+        order = determine_order(active_players, position_stacks, rng)
         
         for idx, player in enumerate(order):
             is_first = (idx == 0)
@@ -156,14 +160,17 @@ def simulate_game(players):
     
     return None
 
-# ------------ 主程序 ------------
-if __name__ == "__main__":
-    players = [
+def create_players():
+    return [
         JinXi("今汐"),
         ShouAnRen("守岸人"),
         KaKaLuo("卡卡罗"),
         ChangLi("长离")
     ]
+
+# ------------ 主程序 ------------
+if __name__ == "__main__":
+    players = create_players()
     
     simulations = 10000
     results = defaultdict(int)
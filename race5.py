@@ -6,6 +6,7 @@ TRACK_LENGTH = 24  # 24步赛道
 class Player:
     def __init__(self, name):
         self.name = name
+        self.rng = random  # 随机源，由 simulate_game 注入
         self.position = 0
         self.reached = False
         self.reset()
@@ -16,7 +17,7 @@ class Player:
         self.next_turn_extra = 0  # 用于赞妮
     
     def roll_dice(self):
-        return random.randint(1, 3)
+        return self.rng.randint(1, 3)
     
     def move(self, steps, position_stacks, carry_above=True):
         if self.reached:
@@ -55,7 +56,7 @@ class Player:
 # ========= 选手实现 =========
 class ShouAnRen(Player):
     def roll_dice(self):
-        return random.choice([2, 3])
+        return self.rng.choice([2, 3])
     def take_turn(self, position_stacks, players, is_first=False, is_last=False):
         steps = self.roll_dice()
         return self.move(steps, position_stacks)
@@ -73,7 +74,7 @@ class KaKaLuo(Player):
 
 class Zanni(Player):
     def roll_dice(self):
-        return random.choice([1, 3])
+        return self.rng.choice([1, 3])
     
     def take_turn(self, position_stacks, players, is_first=False, is_last=False):
         steps = self.roll_dice() + self.next_turn_extra
@@ -85,7 +86,7 @@ class Zanni(Player):
         if not self.reached:
             stack = position_stacks.get(self.position, [])
             if len(stack) > 1 and self in stack:
-                if random.random() < 0.4:
+                if self.rng.random() < 0.4:
                     self.next_turn_extra = 2
         
         return winner
@@ -96,17 +97,20 @@ class BuLanTe(Player):
         return self.move(steps, position_stacks)
 
 # ========= 模拟逻辑 =========
-def determine_order(active_players):
+def determine_order(active_players, rng=random):
     order = active_players.copy()
-    random.shuffle(order)
+    rng.shuffle(order)
     return order
 
-def simulate_game(players):
+def simulate_game(players, rng=random, stacks=None):
+    # rng 为随机源，默认全局 random 模块；也可传入 random.Random 或 rng.BufferedRandom
+    # stacks 可传入一个空的 defaultdict(list) 作为棋盘，结束后即为最终堆叠（equivalence.py 用来取名次）
     for p in players:
         p.reset()
+        p.rng = rng
     
-    position_stacks = defaultdict(list)
-    position_stacks[0] = random.sample(players, len(players))
+    position_stacks = defaultdict(list) if stacks is None else stacks
+    position_stacks[0] = rng.sample(players, len(players))
     
     while True:
         # 检查终点
@@ -118,7 +122,7 @@ def simulate_game(players):
         if not active_players:
             break
         
-        order = determine_order(active_players)
+        order = determine_order(active_players, rng)
         
         for idx, player in enumerate(order):
             winner = player.take_turn(
@@ -132,13 +136,16 @@ def simulate_game(players):
     
     return None
 
-if __name__ == "__main__":
-    players = [
+def create_players():
+    return [
         ShouAnRen("守岸人"),
         KaKaLuo("卡卡罗"),
         Zanni("赞妮"),
         BuLanTe("布兰特")
     ]
+
+if __name__ == "__main__":
+    players = create_players()
     
     simulations = 10000
     results = defaultdict(int)
@@ -0,0 +1,198 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from engine import Game, play
+from rosters import get_roster
+from runner import CHUNK_SIZE, chunk_seed, make_rng, map_chunks, split_chunks
+from skills import compile_roster
+
+# 逐局记录：每局一条定长记录，按块追加到 .npy 文件，内存占用与总场数无关
+# 写入时进程池中同时最多 2 × 进程数 个块，按块编号顺序取走一块再提交下一块
+# 每条记录：胜者、轮数、步数、各团子最终格子、最终排名（第一名在前）、各团子技能生效次数（每次生效计一次）
+# 文件头长度固定，写入时先占位，关闭时回填实际行数，所以生成的文件可以直接 np.load(mmap_mode="r")
+# 读取时按块遍历内存映射，汇总统计同样只占用一块的内存
+
+MAGIC = b"\x93NUMPY\x01\x00"
+HEADER_LEN = 256  # 含 MAGIC 与长度字段，64 字节对齐
+READ_CHUNK = 1 << 20
+
+
+def record_dtype(n_players):
+    return np.dtype([
+        ("winner", "i1"),
+        ("rounds", "u2"),
+        ("turns", "u4"),
+        ("cell", "u2", (n_players,)),
+        ("ranking", "i1", (n_players,)),
+        ("triggers", "u2", (n_players,)),
+    ])
+
+
+def npy_header(dtype, rows):
+    header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (rows,)})
+    body = HEADER_LEN - len(MAGIC) - 2
+    if len(header) + 1 > body:
+        raise ValueError("记录格式过长，无法放入定长文件头")
+    return MAGIC + body.to_bytes(2, "little") + header.ljust(body - 1).encode("latin1") + b"\n"
+
+
+class RecordWriter:
+    # 定长记录的流式写入器：每次追加一块结构化数组，close 时回填文件头中的行数
+    def __init__(self, path, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.rows = 0
+        self.file = open(path, "wb")
+        self.file.write(npy_header(self.dtype, 0))
+
+    def append(self, records):
+        self.file.write(np.ascontiguousarray(records, dtype=self.dtype).tobytes())
+        self.rows += len(records)
+
+    def close(self):
+        self.file.seek(0)
+        self.file.write(npy_header(self.dtype, self.rows))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# 每次技能生效只计一次：概率技能计判定成功；以下确定性事件只是同一次生效的前提或兑现，不另计
+# 赞妮判定成功后下回合 +2 步（Zanni:extra），卡提希娅获得增益（KaTiXiYa:activate）后每次 +2 步另有判定
+UNCOUNTED_EVENTS = {"Zanni:extra", "KaTiXiYa:activate"}
+HOOK_LISTS = ("roll", "step_bonus", "turn", "move", "after_move")
+
+
+class CountingGame(Game):
+    # 按团子编号统计技能生效次数；actor 为当前正在执行挂钩的团子，由 attribute_hooks 包装的挂钩设置
+    # 同一阵容里有两个相同技能类型的团子时，也各记各的
+    def __init__(self, table, rng):
+        super().__init__(table, rng)
+        self.actor = None
+        self.triggers = [0] * table.n_players
+
+    def chance(self, key):
+        hit = self.rng.random() < self.params[key]
+        if hit:
+            self.triggers[self.actor] += 1
+        return hit
+
+    def trigger(self, event):
+        if event not in UNCOUNTED_EVENTS:
+            self.triggers[self.actor] += 1
+
+
+def actor_hook(hook):
+    # 挂钩的前两个参数总是 (game, 团子编号)
+    def wrapped(game, i, *args):
+        game.actor = i
+        return hook(game, i, *args)
+    return wrapped
+
+
+def attribute_hooks(table):
+    # 就地包装挂钩表中按团子的挂钩，使 CountingGame 知道技能属于哪个团子；只用于本模块自己编译的表
+    for name in HOOK_LISTS:
+        setattr(table, name, [hook and actor_hook(hook) for hook in getattr(table, name)])
+    table.pre_order = [(i, actor_hook(hook)) for i, hook in table.pre_order]
+    return table
+
+
+def record_chunk(key, chunk_id, n, seed):
+    table = attribute_hooks(compile_roster(get_roster(key)))
+    rng = make_rng(chunk_seed(seed, chunk_id))
+    records = np.empty(n, dtype=record_dtype(table.n_players))
+    for g in range(n):
+        game = play(table, rng, CountingGame)
+        record = records[g]
+        record["winner"] = game.winner
+        record["rounds"] = game.rounds
+        record["turns"] = game.turns
+        record["cell"] = game.board.cell
+        record["ranking"] = game.board.ranking()
+        record["triggers"] = game.triggers
+    return records
+
+
+def write_records(key, simulations, path, seed=0, workers=None, chunk_size=CHUNK_SIZE):
+    # 各块在进程池中生成，按块编号顺序追加到文件
+    n_players = len(get_roster(key)["players"])
+    workers = workers or os.cpu_count() or 1
+    args = [(key, chunk_id, n, seed) for chunk_id, n in split_chunks(simulations, chunk_size)]
+    with RecordWriter(path, record_dtype(n_players)) as writer:
+        for records in map_chunks(record_chunk, args, workers, window=2 * workers):
+            writer.append(records)
+    return writer.rows
+
+
+def iter_records(path, chunk=READ_CHUNK):
+    # 按块产出内存映射中的记录，不整体读入
+    records = np.load(path, mmap_mode="r")
+    for start in range(0, len(records), chunk):
+        yield records[start:start + chunk]
+
+
+def summarize(path, chunk=READ_CHUNK):
+    # 胜场、名次分布、轮数直方图、技能生效次数之和；空文件返回全零
+    n_players = np.load(path, mmap_mode="r").dtype["cell"].shape[0]
+    total = 0
+    wins = np.zeros(n_players, dtype=np.int64)
+    places = np.zeros((n_players, n_players), dtype=np.int64)
+    rounds = np.zeros(0, dtype=np.int64)
+    triggers = np.zeros(n_players, dtype=np.int64)
+    for records in iter_records(path, chunk):
+        total += len(records)
+        wins += np.bincount(records["winner"], minlength=n_players)
+        for rank in range(n_players):
+            places[:, rank] += np.bincount(records["ranking"][:, rank], minlength=n_players)
+        hist = np.bincount(records["rounds"])
+        if len(hist) > len(rounds):
+            rounds = np.pad(rounds, (0, len(hist) - len(rounds)))
+        rounds[:len(hist)] += hist
+        triggers += records["triggers"].sum(axis=0, dtype=np.int64)
+    return {"games": total, "wins": wins, "places": places, "rounds": rounds, "triggers": triggers}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="逐局记录的写入与汇总")
+    sub = parser.add_subparsers(dest="command", required=True)
+    write = sub.add_parser("write", help="模拟并写入逐局记录")
+    write.add_argument("roster", help="阵容，如 race1 ~ race5")
+    write.add_argument("-n", "--simulations", type=int, default=1000000)
+    write.add_argument("--seed", type=int, default=0)
+    write.add_argument("-j", "--workers", type=int, default=None)
+    write.add_argument("-o", "--output", default="records.npy")
+    summary = sub.add_parser("summary", help="分块汇总记录文件")
+    summary.add_argument("path")
+    summary.add_argument("--roster", default=None, help="用于显示团子名字")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "write":
+        rows = write_records(args.roster, args.simulations, args.output, args.seed, args.workers)
+        print(f"已写入 {rows} 局到 {args.output}（耗时 {time.perf_counter() - start:.2f}s）")
+    else:
+        stats = summarize(args.path)
+        games = stats["games"]
+        n_players = len(stats["wins"])
+        if args.roster:
+            names = [name for _, name in get_roster(args.roster)["players"]]
+        else:
+            names = [f"选手{i}" for i in range(n_players)]
+        if not games:
+            raise SystemExit(f"{args.path} 中没有记录")
+        rounds = stats["rounds"]
+        mean_rounds = (rounds * np.arange(len(rounds))).sum() / games
+        print(f"{games} 局，平均 {mean_rounds:.2f} 轮，最多 {len(rounds) - 1} 轮")
+        for i, name in enumerate(names):
+            print(f"{name}: 胜率 {stats['wins'][i] / games * 100:.2f}%，"
+                  f"期望名次 {(stats['places'][i] * np.arange(1, n_players + 1)).sum() / games:.3f}，"
+                  f"每局技能生效 {stats['triggers'][i] / games:.3f}次")
+        print(f"耗时 {time.perf_counter() - start:.2f}s")
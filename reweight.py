@@ -0,0 +1,152 @@
+import argparse
+import time
+from itertools import product
+
+import numpy as np
+
+from engine import Game, play
+from rosters import TRACK_LENGTH, get_roster
+from runner import CHUNK_SIZE, chunk_seed, make_rng, map_chunks, split_chunks
+from skills import DEFAULT_PARAMS, compile_roster
+
+# 参数敏感性扫描：在一组采样参数下模拟一次，逐局记录每个概率技能判定为真 / 假的次数
+# 其他参数点 θ' 的胜率用似然比重加权估计（自归一化重要性采样）：
+#   w = Π_k (θ'_k/θ_k)^真_k · ((1-θ'_k)/(1-θ_k))^假_k
+# 技能是否判定只取决于之前的局面，所以逐次判定的似然比连乘即整局的似然比
+# 有效样本量 ESS = (Σw)² / Σw² 低于 min_ess（占总场数的比例）的参数点改为重新模拟
+
+KEYS = tuple(DEFAULT_PARAMS)
+KEY_INDEX = {key: k for k, key in enumerate(KEYS)}
+MIN_ESS = 0.1
+
+
+class RecordingGame(Game):
+    def __init__(self, table, rng):
+        super().__init__(table, rng)
+        self.hits = [0] * len(KEYS)
+        self.misses = [0] * len(KEYS)
+
+    def chance(self, key):
+        hit = self.rng.random() < self.params[key]
+        k = KEY_INDEX[key]
+        if hit:
+            self.hits[k] += 1
+        else:
+            self.misses[k] += 1
+        return hit
+
+
+def record_chunk(key, chunk_id, n, seed, params, track_length=TRACK_LENGTH):
+    # 返回 (胜者, 判定为真次数, 判定为假次数)，后两者形状为 (n, 参数个数)
+    table = compile_roster(get_roster(key), params, track_length)
+    rng = make_rng(chunk_seed(seed, chunk_id))
+    winners = np.empty(n, dtype=np.int8)
+    hits = np.empty((n, len(KEYS)), dtype=np.int32)
+    misses = np.empty((n, len(KEYS)), dtype=np.int32)
+    for g in range(n):
+        game = play(table, rng, RecordingGame)
+        winners[g] = game.winner
+        hits[g] = game.hits
+        misses[g] = game.misses
+    return winners, hits, misses
+
+
+def record(key, simulations, params=None, seed=0, workers=None, track_length=TRACK_LENGTH, chunk_size=CHUNK_SIZE):
+    args = [(key, chunk_id, n, seed, params, track_length) for chunk_id, n in split_chunks(simulations, chunk_size)]
+    parts = list(map_chunks(record_chunk, args, workers))
+    return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+
+def log_weights(hits, misses, params, target):
+    base = np.array([params[k] for k in KEYS])
+    new = np.array([target[k] for k in KEYS])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_hit = np.log(new) - np.log(base)
+        log_miss = np.log1p(-new) - np.log1p(-base)
+    # 参数未变的项以及判定次数为 0 的项不参与：用 where 掩码只在次数 > 0 处相乘，不产生 0 × inf
+    same = new == base
+    log_hit[same] = 0
+    log_miss[same] = 0
+    shape = np.broadcast_shapes(hits.shape, log_hit.shape)
+    hit_terms = np.multiply(hits, log_hit, out=np.zeros(shape), where=hits > 0)
+    miss_terms = np.multiply(misses, log_miss, out=np.zeros(shape), where=misses > 0)
+    return hit_terms.sum(axis=1) + miss_terms.sum(axis=1)
+
+
+def reweighted_rates(winners, hits, misses, n_players, params, target):
+    # 返回 (各选手胜率, ESS 比例)
+    logw = log_weights(hits, misses, params, target)
+    if not np.isfinite(logw).any():
+        return None, 0.0
+    w = np.exp(logw - logw.max())
+    ess = w.sum() ** 2 / (w * w).sum() / len(w)
+    rates = np.bincount(winners, weights=w, minlength=n_players) / w.sum()
+    return rates, ess
+
+
+def grid_points(grid):
+    # grid: {参数: [取值...]} -> 笛卡尔积上的参数覆盖
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in product(*(grid[k] for k in keys))]
+
+
+def sweep(key, grid, simulations, params=None, seed=0, workers=None, min_ess=MIN_ESS, track_length=TRACK_LENGTH):
+    # 产出 (参数覆盖, 各选手胜率, ESS 比例, 是否重新模拟)
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    n_players = len(get_roster(key)["players"])
+    winners, hits, misses = record(key, simulations, params, seed, workers, track_length)
+    for point in grid_points(grid):
+        target = {**params, **point}
+        rates, ess = reweighted_rates(winners, hits, misses, n_players, params, target)
+        if ess >= min_ess:
+            yield point, rates, ess, False
+        else:
+            # 重新模拟用由参数点派生的种子，与采样参数下的那次模拟互不重复
+            fresh_seed = f"{seed}/fresh/{sorted(point.items())}"
+            fresh = record(key, simulations, target, fresh_seed, workers, track_length)[0]
+            yield point, np.bincount(fresh, minlength=n_players) / simulations, 1.0, True
+
+
+def parse_grid(items):
+    # "KeLaiTa=0.2:0.36:0.04" 或 "Chun=0.4,0.5,0.6"
+    grid = {}
+    for item in items:
+        key, _, spec = item.partition("=")
+        if key not in DEFAULT_PARAMS:
+            raise ValueError(f"未知参数: {key}，可选: {', '.join(DEFAULT_PARAMS)}")
+        if ":" in spec:
+            start, stop, step = (float(x) for x in spec.split(":"))
+            grid[key] = [round(v, 10) for v in np.arange(start, stop + step / 2, step)]
+        else:
+            grid[key] = [float(x) for x in spec.split(",")]
+    return grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="用似然比重加权做技能概率的敏感性扫描")
+    parser.add_argument("roster", help="阵容，如 race1 ~ race5")
+    parser.add_argument("--grid", nargs="+", required=True, metavar="KEY=SPEC",
+                        help="扫描的参数，如 KeLaiTa=0.2:0.36:0.04 或 Chun=0.4,0.5,0.6")
+    parser.add_argument("--sample", nargs="*", default=[], metavar="KEY=VALUE", help="采样参数，默认为脚本原值")
+    parser.add_argument("-n", "--simulations", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--min-ess", type=float, default=MIN_ESS, help="ESS 占总场数的最低比例，低于此值重新模拟")
+    parser.add_argument("--track-length", type=int, default=TRACK_LENGTH)
+    args = parser.parse_args()
+
+    grid = parse_grid(args.grid)
+    sample = {k: float(v) for k, _, v in (item.partition("=") for item in args.sample)}
+    names = [name for _, name in get_roster(args.roster)["players"]]
+
+    start = time.perf_counter()
+    print(" ".join(grid) + "  " + "  ".join(names) + "  ESS")
+    fresh_points = 0
+    for point, rates, ess, fresh in sweep(args.roster, grid, args.simulations, sample, args.seed,
+                                          args.workers, args.min_ess, args.track_length):
+        fresh_points += fresh
+        values = " ".join(f"{point[k]:.3f}" for k in grid)
+        cells = "  ".join(f"{r * 100:.2f}%" for r in rates)
+        print(f"{values}  {cells}  {'重新模拟' if fresh else f'{ess * 100:.0f}%'}")
+    elapsed = time.perf_counter() - start
+    print(f"{len(grid_points(grid))} 个参数点，其中 {fresh_points} 个重新模拟，耗时 {elapsed:.1f}s")
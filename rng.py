@@ -0,0 +1,77 @@
+import random
+from itertools import chain
+
+import numpy as np
+
+# 随机源：只有骰子点数（randint）用 numpy 按块预先生成、之后逐个取用，其余抽取都不缓冲
+# 接口与 random 模块一致（random / randint / choice / shuffle / sample / seed），可直接替换传入原脚本和引擎
+# 同一 seed 得到完全相同的随机序列；randint 按 (a, b) 各自维护一个整数缓冲
+# 均匀数不缓冲：按块生成再逐个取用约 63ns/个（numpy 浮点块；getrandbits(53) 块更慢），random.Random.random 约 31ns，
+# 所以 random() 直接绑定到同一 seed 的 random.Random；choice / shuffle / sample 由它换算
+# 抽到的序列与全局 random 不同，因此与原脚本的结果只在统计意义上一致
+
+BLOCK = 1 << 12
+
+
+class BufferedRandom:
+    def __init__(self, seed=None, block=BLOCK):
+        self.block = block
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        self.gen = np.random.default_rng(seed)
+        self.random = random.Random(seed).random
+        self._ints = {}
+
+    def _stream(self, a, b):
+        # 无限流：块用完时 chain 自动再生成一块，取数是 C 层的 __next__
+        dtype = np.int8 if -128 <= a and b < 128 else np.int64
+        blocks = iter(lambda: self.gen.integers(a, b + 1, self.block, dtype=dtype).tolist(), None)
+        return chain.from_iterable(blocks).__next__
+
+    def randint(self, a, b):
+        draw = self._ints.get((a, b))
+        if draw is None:
+            draw = self._ints[a, b] = self._stream(a, b)
+        return draw()
+
+    # 以下均由 random() 换算出 0 ~ n-1 的均匀整数：int(random() * n)
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def shuffle(self, x):
+        # Fisher-Yates，与 random.shuffle 相同的交换顺序
+        random = self.random
+        for i in range(len(x) - 1, 0, -1):
+            j = int(random() * (i + 1))
+            x[i], x[j] = x[j], x[i]
+
+    def sample(self, population, k):
+        pool = list(population)
+        n = len(pool)
+        if not 0 <= k <= n:
+            raise ValueError("样本数超出总体大小")
+        random = self.random
+        for i in range(k):
+            j = i + int(random() * (n - i))
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
+
+
+class StreamRandom:
+    # 按用途拆分的随机源：开局堆叠与行动顺序 / 骰子 / 技能判定各用一条独立的流
+    # 配对比较时两种规则用同一个种子重新播种，即使某个变体多判定一次技能或多走一轮，
+    # 其余用途的随机数仍然一一对应（公共随机数）
+    def __init__(self, seed=None):
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        order, dice, skill = (
+            random.Random(None if seed is None else f"{seed}/{purpose}") for purpose in ("order", "dice", "skill")
+        )
+        self.shuffle = order.shuffle
+        self.sample = order.sample
+        self.randint = dice.randint
+        self.choice = dice.choice
+        self.random = skill.random
@@ -0,0 +1,90 @@
+# 各脚本阵容的统一描述，供新引擎复用
+# players 中每项为 (技能类型, 名字)，技能类型与脚本里的类名一致
+# rules 标记沿用哪份脚本的规则细节：
+#   race1: 卡卡罗需处于最后一格的堆叠底部，长离在排序时判定是否最后行动
+#   race3: 卡卡罗只看格子是否最后，长离在自己移动后判定下回合是否最后行动
+# start 标记开局堆叠的抽法："shuffle" 为 race1 / race2 / race4 脚本的 rng.shuffle，默认为 race3 / race5 的 rng.sample
+
+TRACK_LENGTH = 24
+
+# README 中的全部 12 个团子（A 组 + B 组），供遍历阵容使用
+DANGO = [
+    ("JinXi", "今汐"),
+    ("KeLaiTa", "珂莱塔"),
+    ("Chun", "椿"),
+    ("ShouAnRen", "守岸人"),
+    ("KaKaLuo", "卡卡罗"),
+    ("ChangLi", "长离"),
+    ("FeiBi", "菲比"),
+    ("KaTiXiYa", "卡提希娅"),
+    ("Zanni", "赞妮"),
+    ("KanTeLeiLa", "坎特蕾拉"),
+    ("BuLanTe", "布兰特"),
+    ("LuoKeKe", "洛可可"),
+]
+
+ROSTERS = {
+    "race1": {
+        "rules": "race1",
+        "start": "shuffle",
+        "players": [
+            ("JinXi", "今汐"),
+            ("KeLaiTa", "珂莱塔"),
+            ("Chun", "椿"),
+            ("ShouAnRen", "守岸人"),
+            ("KaKaLuo", "卡卡罗"),
+            ("ChangLi", "长离"),
+        ],
+    },
+    "race2": {
+        "rules": "race3",
+        "start": "shuffle",
+        "players": [
+            ("FeiBi", "菲比"),
+            ("KaTiXiYa", "卡提希娅"),
+            ("Zanni", "赞妮"),
+            ("KanTeLeiLa", "坎特蕾拉"),
+            ("BuLanTe", "布兰特"),
+            ("LuoKeKe", "洛可可"),
+        ],
+    },
+    "race3": {
+        "rules": "race3",
+        "players": [
+            ("JinXi", "今汐"),
+            ("ShouAnRen", "守岸人"),
+            ("KaKaLuo", "卡卡罗"),
+            ("ChangLi", "长离"),
+        ],
+    },
+    "race4": {
+        "rules": "race3",
+        "start": "shuffle",
+        "players": [
+            ("FeiBi", "菲比"),
+            ("Zanni", "赞妮"),
+            ("BuLanTe", "布兰特"),
+            ("LuoKeKe", "洛可可"),
+        ],
+    },
+    "race5": {
+        "rules": "race3",
+        "players": [
+            ("ShouAnRen", "守岸人"),
+            ("KaKaLuo", "卡卡罗"),
+            ("Zanni", "赞妮"),
+            ("BuLanTe", "布兰特"),
+        ],
+    },
+}
+
+
+def get_roster(key):
+    if key not in ROSTERS:
+        raise KeyError(f"未知阵容: {key}，可选: {', '.join(ROSTERS)}")
+    return ROSTERS[key]
+
+
+def make_roster(players, rules="race3"):
+    # 由 (技能类型, 名字) 列表构造阵容，默认沿用 race3 的规则
+    return {"rules": rules, "players": list(players)}
@@ -0,0 +1,325 @@
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count
+from statistics import NormalDist
+
+from rosters import get_roster
+
+# 多进程蒙特卡洛：模拟总数按固定大小切块，每块用 (seed, 块编号) 派生独立的随机流
+# 块的划分和种子与进程数无关，所以同一 seed 下任意进程数得到的结果完全一致
+
+CHUNK_SIZE = 10000
+ENGINES = ("reference", "fast", "batch")
+MAX_SIMULATIONS = 10 ** 8
+CHECKPOINT_INTERVAL = 60  # 秒
+
+
+def chunk_seed(seed, chunk_id):
+    digest = hashlib.sha256(f"{seed}/{chunk_id}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def split_chunks(simulations, chunk_size=CHUNK_SIZE):
+    return [
+        (chunk_id, min(chunk_size, simulations - start))
+        for chunk_id, start in enumerate(range(0, simulations, chunk_size))
+    ]
+
+
+def make_rng(seed):
+    # 每块独立的带缓冲随机源，见 rng.py
+    from rng import BufferedRandom
+
+    return BufferedRandom(seed)
+
+
+def run_reference_chunk(key, n, seed):
+    # 原脚本的随机源由 simulate_game 注入，不再依赖全局 random
+    module = importlib.import_module(key)
+    players = module.create_players()
+    rng = make_rng(seed)
+    results = Counter()
+    for _ in range(n):
+        if winner := module.simulate_game(players, rng):
+            results[winner] += 1
+    return results
+
+
+def run_fast_chunk(key, n, seed):
+    from engine import simulate_game
+    from skills import compile_roster
+
+    table = compile_roster(get_roster(key))
+    rng = make_rng(seed)
+    results = Counter()
+    for _ in range(n):
+        results[table.names[simulate_game(table, rng)]] += 1
+    return results
+
+
+def run_batch_chunk(key, n, seed):
+    import numpy as np
+
+    from batch_engine import simulate_batch
+
+    roster = get_roster(key)
+    places = simulate_batch(roster, n, np.random.default_rng(seed))
+    return Counter({name: int(w) for (_, name), w in zip(roster["players"], places[:, 0])})
+
+
+def run_chunk(engine, key, chunk_id, n, seed):
+    if engine == "batch":
+        return run_batch_chunk(key, n, chunk_seed(seed, chunk_id))
+    if engine == "fast":
+        return run_fast_chunk(key, n, chunk_seed(seed, chunk_id))
+    return run_reference_chunk(key, n, chunk_seed(seed, chunk_id))
+
+
+def merge_results(results, counts):
+    for name, wins in counts.items():
+        results[name] += wins
+    return results
+
+
+def map_chunks(fn, args, workers=None, pool=None, window=None):
+    # 按参数顺序产出 fn(*a) 的结果，workers > 1 时在进程池中执行；给出 pool 时复用已有的进程池
+    # window 为同时提交的块数上限：取走最早的结果后才提交下一块，未取走的结果最多 window 个；None 为一次全部提交
+    if pool is None:
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            for a in args:
+                yield fn(*a)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from map_chunks(fn, args, pool=pool, window=window)
+        return
+    if window is None:
+        yield from pool.map(fn, *zip(*args))
+        return
+    pending = deque()
+    try:
+        for a in args:
+            pending.append(pool.submit(fn, *a))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def run_chunks(engine, key, chunks, seed, workers):
+    # 按块编号顺序产出每块的计数
+    return map_chunks(run_chunk, [(engine, key, chunk_id, n, seed) for chunk_id, n in chunks], workers)
+
+
+def save_checkpoint(path, state):
+    # 先写临时文件再原子替换，进程在任何时刻被杀掉都不会留下半个文件
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path, config):
+    # 检查点记录累计计数与已完成的块编号；每块的随机流只由 (seed, 块编号) 决定，所以块编号即随机流位置
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    mismatched = [k for k, v in config.items() if state.get(k) != v]
+    if mismatched:
+        raise ValueError(f"检查点 {path} 与本次参数不一致: {', '.join(mismatched)}")
+    return state
+
+
+class Checkpointer:
+    # 每隔 interval 秒把累计结果写入检查点，path 为 None 时什么都不做
+    def __init__(self, path, config, interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.config = config
+        self.interval = interval
+        self.last = time.monotonic()
+
+    def restore(self):
+        # 返回 (累计计数, 已完成块编号)，没有检查点时从头开始
+        if self.path is None or not os.path.exists(self.path):
+            return {}, set()
+        state = load_checkpoint(self.path, self.config)
+        return state["results"], set(state["done"])
+
+    def update(self, results, done, force=False):
+        if self.path is None or not (force or time.monotonic() - self.last >= self.interval):
+            return
+        save_checkpoint(self.path, {**self.config, "results": results, "done": sorted(done)})
+        self.last = time.monotonic()
+
+
+def run_parallel(key, simulations, seed=0, workers=None, engine="reference", chunk_size=CHUNK_SIZE,
+                 checkpoint=None, resume=False, interval=CHECKPOINT_INTERVAL):
+    # checkpoint 为检查点路径；resume 时跳过已完成的块，合计与不中断运行完全一致
+    if engine not in ENGINES:
+        raise ValueError(f"未知引擎: {engine}，可选: {', '.join(ENGINES)}")
+    workers = workers or os.cpu_count() or 1
+    config = {"roster": key, "engine": engine, "seed": seed, "simulations": simulations, "chunk_size": chunk_size}
+    saver = Checkpointer(checkpoint, config, interval)
+    results = {name: 0 for _, name in get_roster(key)["players"]}
+    done = set()
+    if resume:
+        restored, done = saver.restore()
+        merge_results(results, restored)
+    chunks = [(chunk_id, n) for chunk_id, n in split_chunks(simulations, chunk_size) if chunk_id not in done]
+    for (chunk_id, _), counts in zip(chunks, run_chunks(engine, key, chunks, seed, workers)):
+        merge_results(results, counts)
+        done.add(chunk_id)
+        saver.update(results, done)
+    saver.update(results, done, force=True)
+    return results
+
+
+def iter_chunks(engine, key, seed, workers, chunk_size=CHUNK_SIZE, start=0):
+    # 从块 start 开始的无限块流，始终保持 workers 个块在进程池中运行，按块编号顺序产出
+    if workers == 1:
+        for chunk_id in count(start):
+            yield run_chunk(engine, key, chunk_id, chunk_size, seed)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        try:
+            for chunk_id in count(start):
+                pending.append(pool.submit(run_chunk, engine, key, chunk_id, chunk_size, seed))
+                if len(pending) >= workers:
+                    yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def wilson_halfwidth(wins, n, z):
+    p = wins / n
+    return z * (p * (1 - p) / n + z * z / (4 * n * n)) ** 0.5 / (1 + z * z / n)
+
+
+def confidence_halfwidths(results, simulations, confidence=0.95):
+    # 多项分布的同时置信区间：对各选手的 Wilson 区间做 Bonferroni 校正
+    alpha = 1 - confidence
+    z = NormalDist().inv_cdf(1 - alpha / (2 * len(results)))
+    return {name: wilson_halfwidth(wins, simulations, z) for name, wins in results.items()}
+
+
+def run_until_precision(key, precision, confidence=0.95, seed=0, workers=None, engine="reference",
+                        chunk_size=CHUNK_SIZE, max_simulations=MAX_SIMULATIONS,
+                        checkpoint=None, resume=False, interval=CHECKPOINT_INTERVAL):
+    # 逐块累计，每块之后检查所有选手胜率的置信区间半宽是否都不超过 precision
+    # 判定按块编号顺序进行，多算的块直接丢弃，因此结果与进程数无关
+    # 已完成的块总是从 0 开始连续编号，恢复时从下一块继续
+    if engine not in ENGINES:
+        raise ValueError(f"未知引擎: {engine}，可选: {', '.join(ENGINES)}")
+    workers = workers or os.cpu_count() or 1
+    config = {"roster": key, "engine": engine, "seed": seed, "chunk_size": chunk_size,
+              "precision": precision, "confidence": confidence, "max_simulations": max_simulations}
+    saver = Checkpointer(checkpoint, config, interval)
+    results = {name: 0 for _, name in get_roster(key)["players"]}
+    done = set()
+    if resume:
+        restored, done = saver.restore()
+        merge_results(results, restored)
+    simulations = len(done) * chunk_size
+    if simulations:
+        halfwidths = confidence_halfwidths(results, simulations, confidence)
+        if max(halfwidths.values()) <= precision or simulations >= max_simulations:
+            return results, simulations, halfwidths
+    chunks = iter_chunks(engine, key, seed, workers, chunk_size, start=len(done))
+    try:
+        for counts in chunks:
+            merge_results(results, counts)
+            done.add(len(done))
+            simulations += chunk_size
+            saver.update(results, done)
+            halfwidths = confidence_halfwidths(results, simulations, confidence)
+            if max(halfwidths.values()) <= precision or simulations >= max_simulations:
+                break
+    finally:
+        chunks.close()
+    saver.update(results, done, force=True)
+    return results, simulations, halfwidths
+
+
+def print_results(results, simulations):
+    print(f"模拟次数：{simulations}次")
+    print("胜率统计：")
+    for name, wins in sorted(results.items(), key=lambda x: x[1], reverse=True):
+        print(f"{name}: {wins}次 ({wins/simulations*100:.2f}%)")
+
+
+def print_places(names, places, simulations):
+    # 名次概率矩阵：行为选手，列为名次；最后一列为期望名次
+    n = len(names)
+    print("名次分布：")
+    # 中文字符按两个宽度对齐
+    print("团子".ljust(6) + "".join(f"第{r + 1}名".rjust(7) for r in range(n)) + "期望名次".rjust(5))
+    for name, row in sorted(zip(names, places), key=lambda x: sum((r + 1) * c for r, c in enumerate(x[1]))):
+        expected = sum((r + 1) * c for r, c in enumerate(row)) / simulations
+        cells = "".join(f"{c / simulations * 100:8.2f}%" for c in row)
+        print(name.ljust(8 - len(name)) + cells + f"{expected:9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多进程蒙特卡洛模拟")
+    parser.add_argument("roster", help="阵容，如 race1 ~ race5")
+    parser.add_argument("-n", "--simulations", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--engine", choices=ENGINES, default=None, help="默认 reference；--instrument 时为 fast")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--precision", type=float, default=None,
+                        help="目标精度（百分点），如 0.2 表示各胜率置信区间半宽不超过 ±0.2%%")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--max-simulations", type=int, default=MAX_SIMULATIONS)
+    parser.add_argument("--instrument", action="store_true", help="统计技能触发次数与各阶段耗时（fast 引擎）")
+    parser.add_argument("--checkpoint", default=None, help="检查点文件路径，运行中定期写入累计结果")
+    parser.add_argument("--resume", action="store_true", help="从 --checkpoint 指定的检查点继续")
+    parser.add_argument("--checkpoint-interval", type=float, default=CHECKPOINT_INTERVAL, help="写检查点的间隔（秒）")
+    args = parser.parse_args()
+    if args.resume and not args.checkpoint:
+        parser.error("--resume 需要同时指定 --checkpoint")
+    if args.instrument:
+        if args.engine not in (None, "fast"):
+            parser.error("--instrument 只支持 fast 引擎")
+        if args.precision is not None or args.checkpoint:
+            parser.error("--instrument 不能与 --precision / --checkpoint 同时使用")
+    args.engine = args.engine or ("fast" if args.instrument else "reference")
+
+    start = time.perf_counter()
+    stats = None
+    if args.instrument:
+        from instrument import run_instrumented
+
+        simulations = args.simulations
+        results, stats = run_instrumented(args.roster, simulations, args.seed, args.workers, args.chunk_size)
+    elif args.precision is None:
+        simulations = args.simulations
+        results = run_parallel(args.roster, simulations, args.seed, args.workers, args.engine, args.chunk_size,
+                               args.checkpoint, args.resume, args.checkpoint_interval)
+    else:
+        results, simulations, halfwidths = run_until_precision(
+            args.roster, args.precision / 100, args.confidence, args.seed, args.workers,
+            args.engine, args.chunk_size, args.max_simulations,
+            args.checkpoint, args.resume, args.checkpoint_interval,
+        )
+    elapsed = time.perf_counter() - start
+
+    print_results(results, simulations)
+    if args.precision is not None:
+        print(f"{args.confidence*100:.0f}% 置信区间半宽（目标 ±{args.precision}%）：")
+        for name, hw in sorted(halfwidths.items(), key=lambda x: x[1], reverse=True):
+            print(f"{name}: ±{hw*100:.3f}%")
+    if stats is not None:
+        stats.report()
+    print(f"耗时 {elapsed:.2f}s，{simulations/elapsed:.0f} 场/秒")
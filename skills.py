@@ -0,0 +1,257 @@
+from alias import STEP_HOOKS
+from rosters import TRACK_LENGTH
+
+# 技能注册表：每个团子声明自己用到的挂钩点，开局前按阵容编译成挂钩表
+# 挂钩点：
+#   pre_order(game, i, order)              排序后调整行动顺序（长离）
+#   roll(game, i) -> 点数                  替换默认 1~3 骰子（守岸人、赞妮）
+#   step_bonus(game, i, dice, first, last) 额外步数（菲比、卡提希娅、赞妮、布兰特、洛可可、卡卡罗）
+#   turn(game, i, first, last) -> 胜者     替换整个回合（珂莱塔、椿、race3 的今汐）
+#   move(game, i, steps, carry_above)      替换移动方式（坎特蕾拉）
+#   after_move(game, i)                    回合结束后（今汐、赞妮、卡提希娅、race3 的长离）
+#   after_round(game)                      一轮结束后
+# 与规则版本相关的技能用 rules 单独注册，覆盖通用实现
+# 随机数的调用顺序与原脚本一致
+# 概率技能统一经 game.chance(技能名) 判定，确定性技能生效时调用 game.trigger("技能名:事件") 供统计
+
+HOOKS = ("pre_order", "roll", "step_bonus", "turn", "move", "after_move", "after_round")
+TURN_HOOKS = ("roll", "step_bonus", "turn", "move", "after_move")
+
+# 技能或规则的实现改变时递增，使按规则缓存的结果（odds_cache.py）失效
+RULES_VERSION = 2
+
+DEFAULT_PARAMS = {
+    "JinXi": 0.4,
+    "KeLaiTa": 0.28,
+    "Chun": 0.5,
+    "ChangLi": 0.65,
+    "FeiBi": 0.5,
+    "KaTiXiYa": 0.6,
+    "Zanni": 0.4,
+}
+
+SKILLS = {}
+_HOOK_CACHE = {}  # (技能类型, 规则) -> 合并后的挂钩，编译大量阵容时复用
+
+
+def register(kind, hook, rules=None):
+    if hook not in HOOKS:
+        raise ValueError(f"未知挂钩点: {hook}")
+
+    def wrap(fn):
+        SKILLS.setdefault((kind, rules), {})[hook] = fn
+        _HOOK_CACHE.clear()
+        return fn
+    return wrap
+
+
+def skill_hooks(kind, rules):
+    # 返回的字典在多个挂钩表间共享，调用方不要修改
+    hooks = _HOOK_CACHE.get((kind, rules))
+    if hooks is None:
+        if kind != "Player" and all(k != kind for k, _ in SKILLS):
+            raise ValueError(f"未知技能类型: {kind}")
+        hooks = dict(SKILLS.get((kind, None), {}))
+        hooks.update(SKILLS.get((kind, rules), {}))
+        _HOOK_CACHE[kind, rules] = hooks
+    return hooks
+
+
+class HookTable:
+    # 编译后的挂钩表：每个挂钩点一个按选手编号索引的列表，没有技能的位置为 None
+    # alias=True 时掷骰与额外步数合并为别名表采样（见 alias.py），步数分布不变但随机数用法不同
+    def __init__(self, roster, params=None, track_length=TRACK_LENGTH, alias=False):
+        self.kinds = [kind for kind, _ in roster["players"]]
+        self.names = [name for _, name in roster["players"]]
+        self.rules = roster["rules"]
+        self.shuffle_start = roster.get("start") == "shuffle"
+        self.n_players = len(self.kinds)
+        self.track_length = track_length
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.alias = alias
+
+        per_player = [skill_hooks(kind, self.rules) for kind in self.kinds]
+        if alias:
+            per_player = [
+                {**hooks, **STEP_HOOKS[kind](self.params)} if kind in STEP_HOOKS else hooks
+                for kind, hooks in zip(self.kinds, per_player)
+            ]
+        for hook in ("roll", "step_bonus", "turn", "move", "after_move"):
+            setattr(self, hook, [hooks.get(hook) for hooks in per_player])
+        self.pre_order = [(i, hooks["pre_order"]) for i, hooks in enumerate(per_player) if "pre_order" in hooks]
+        self.after_round = [hooks["after_round"] for hooks in per_player if "after_round" in hooks]
+        # 回合内不需要任何挂钩的选手走快速路径
+        self.plain = [not any(hooks.get(hook) for hook in TURN_HOOKS) for hooks in per_player]
+        # 没有 turn / move 挂钩的选手由 engine.finish 直接展开 掷骰 -> 额外步数 -> 移动 -> 移动后
+        self.direct = [not plain and not hooks.get("turn") and not hooks.get("move")
+                       for plain, hooks in zip(self.plain, per_player)]
+
+
+def compile_roster(roster, params=None, track_length=TRACK_LENGTH, alias=False):
+    return HookTable(roster, params, track_length, alias)
+
+
+# ------------ A组 ------------
+@register("JinXi", "after_move")
+def jinxi_after_move(game, i):
+    # 头顶有其他团子时 40% 概率跃到堆叠顶端
+    board = game.board
+    if not board.is_top(i) and game.chance("JinXi"):
+        board.raise_to_top(i)
+
+
+@register("JinXi", "turn", rules="race3")
+def jinxi_turn_race3(game, i, first, last):
+    # race3：到达终点后仍判定一次跃到顶端，胜者已经确定，但终点堆叠（名次）会变
+    winner = game.default_turn(i, first, last)
+    if winner is not None:
+        jinxi_after_move(game, i)
+    return winner
+
+
+@register("KeLaiTa", "turn")
+def kelaita_turn(game, i, first, last):
+    # 28% 概率按同一骰子点数连续移动两次
+    if game.chance("KeLaiTa"):
+        dice = game.roll(i)
+        for _ in range(2):
+            winner = game.move(i, dice)
+            if winner is not None:
+                return winner
+        return None
+    return game.default_turn(i, first, last)
+
+
+@register("Chun", "turn")
+def chun_turn(game, i, first, last):
+    # 50% 概率单独移动，当前格每有一个其他团子额外 +1 步
+    if game.chance("Chun"):
+        board = game.board
+        others = len(board.stacks[board.cell[i]]) - 1
+        dice = game.roll(i)
+        return game.move(i, dice + others, carry_above=False)
+    return game.default_turn(i, first, last)
+
+
+@register("ShouAnRen", "roll")
+def shouanren_roll(game, i):
+    return game.rng.choice((2, 3))
+
+
+@register("KaKaLuo", "step_bonus")
+def kakaluo_bonus(game, i, dice, first, last):
+    if game.board.is_last(i):
+        game.trigger("KaKaLuo:last")
+        return 3
+    return 0
+
+
+@register("KaKaLuo", "step_bonus", rules="race1")
+def kakaluo_bonus_race1(game, i, dice, first, last):
+    # race1：必须是最后一格堆叠最底部的团子
+    board = game.board
+    if board.is_last(i) and board.last_player() == i:
+        game.trigger("KaKaLuo:last")
+        return 3
+    return 0
+
+
+@register("ChangLi", "pre_order", rules="race1")
+def changli_pre_order_race1(game, i, order):
+    # race1：排序时若不在堆叠底部，65% 概率最后行动
+    if game.board.height[i] > 0 and game.chance("ChangLi"):
+        order.remove(i)
+        order.append(i)
+
+
+@register("ChangLi", "pre_order", rules="race3")
+def changli_pre_order(game, i, order):
+    if game.delay_next_turn[i]:
+        order.remove(i)
+        order.append(i)
+        game.delay_next_turn[i] = False
+
+
+@register("ChangLi", "after_move", rules="race3")
+def changli_after_move(game, i):
+    # race3：移动后不在堆叠底部，65% 概率下回合最后行动
+    if game.board.height[i] > 0:
+        game.delay_next_turn[i] = game.chance("ChangLi")
+
+
+# ------------ B组 ------------
+@register("FeiBi", "step_bonus")
+def feibi_bonus(game, i, dice, first, last):
+    return 1 if game.chance("FeiBi") else 0
+
+
+@register("KaTiXiYa", "step_bonus")
+def katixiya_bonus(game, i, dice, first, last):
+    return 2 if game.buff_active[i] and game.chance("KaTiXiYa") else 0
+
+
+@register("KaTiXiYa", "after_move")
+def katixiya_after_move(game, i):
+    # 每场最多触发一次：移动后处于最后一名则本场剩余回合获得增益
+    if not game.has_triggered[i] and game.board.is_last(i):
+        game.buff_active[i] = True
+        game.has_triggered[i] = True
+        game.trigger("KaTiXiYa:activate")
+
+
+@register("Zanni", "roll")
+def zanni_roll(game, i):
+    return game.rng.choice((1, 3))
+
+
+@register("Zanni", "step_bonus")
+def zanni_bonus(game, i, dice, first, last):
+    extra = game.next_turn_extra[i]
+    if extra:
+        game.next_turn_extra[i] = 0
+        game.trigger("Zanni:extra")
+    return extra
+
+
+@register("Zanni", "after_move")
+def zanni_after_move(game, i):
+    # 移动后处于堆叠状态，40% 概率下回合额外前进 2 格
+    board = game.board
+    if len(board.stacks[board.cell[i]]) > 1 and game.chance("Zanni"):
+        game.next_turn_extra[i] = 2
+
+
+@register("KanTeLeiLa", "move")
+def kanteleila_move(game, i, steps, carry_above=True):
+    # 移动途中首次遇到团子时与该格所有团子合并一起移动，每场最多一次
+    board = game.board
+    if game.has_merged[i]:
+        board.move(i, steps, carry_above)
+        return
+    cell = board.cell[i]
+    group = board.lift(i)
+    for _ in range(steps):
+        if cell >= board.track_length:
+            break
+        cell += 1
+        if not game.has_merged[i] and cell in board.stacks:
+            group.extend(board.lift_all(cell))
+            game.has_merged[i] = True
+            game.trigger("KanTeLeiLa:merge")
+    board.drop(group, cell)
+
+
+@register("BuLanTe", "step_bonus")
+def bulante_bonus(game, i, dice, first, last):
+    if first:
+        game.trigger("BuLanTe:first")
+        return 2
+    return 0
+
+
+@register("LuoKeKe", "step_bonus")
+def luokeke_bonus(game, i, dice, first, last):
+    if last:
+        game.trigger("LuoKeKe:last")
+        return 2
+    return 0
@@ -0,0 +1,145 @@
+import argparse
+import time
+from collections import namedtuple
+
+from engine import Game, finish
+from rosters import TRACK_LENGTH, get_roster
+from runner import CHUNK_SIZE, chunk_seed, make_rng, map_chunks, split_chunks
+from skills import compile_roster
+
+# 比赛中途的局面快照与条件胜率
+# 快照只由元组组成，复制为零开销：
+#   stacks  ((格子, (底 -> 顶的团子编号...)), ...)，与 Board.snapshot() 相同
+#   flags   FLAGS 中每个标记一个按团子编号的元组
+#   rounds  当前是第几轮（order 为 None 时表示已结束的轮数）
+#   order   本轮已确定的行动顺序；None 表示下一步是新一轮排序
+#   slot    本轮下一个行动的位置
+# 从快照出发时新建 Game、按快照恢复棋盘和标记，再交给 engine.finish 跑完
+
+FLAGS = ("next_turn_extra", "has_merged", "buff_active", "has_triggered", "delay_next_turn")
+
+State = namedtuple("State", "stacks flags rounds order slot")
+
+
+def capture(game, order=None, slot=0):
+    return State(
+        game.board.snapshot(),
+        tuple(tuple(getattr(game, flag)) for flag in FLAGS),
+        game.rounds,
+        None if order is None else tuple(order),
+        slot,
+    )
+
+
+def restore(table, state, rng):
+    game = Game(table, rng)
+    game.board.restore(state.stacks)
+    for flag, values in zip(FLAGS, state.flags):
+        setattr(game, flag, list(values))
+    game.rounds = state.rounds
+    return game
+
+
+def play_from(table, state, rng):
+    order = None if state.order is None else list(state.order)
+    return finish(restore(table, state, rng), order, state.slot)
+
+
+def make_state(table, stacks, flags=None, rounds=0, order=None, slot=0):
+    # 用名字描述局面：stacks 为 {格子: [底 -> 顶的名字...]}，flags 为 {标记: {名字: 值}}，order 为名字列表
+    index = {name: i for i, name in enumerate(table.names)}
+
+    def lookup(name, field):
+        if name not in index:
+            raise ValueError(f"{field} 中的未知团子: {name}，可选: {', '.join(table.names)}")
+        return index[name]
+
+    placed = sorted(lookup(name, "stacks") for names in stacks.values() for name in names)
+    if placed != list(range(table.n_players)):
+        raise ValueError("每个团子必须且只能出现在一个格子里")
+    if any(not 0 <= cell < table.track_length for cell in stacks):
+        raise ValueError(f"格子必须在 0 ~ {table.track_length - 1} 之间")
+    values = {flag: [0 if flag == "next_turn_extra" else False] * table.n_players for flag in FLAGS}
+    for flag, per_player in (flags or {}).items():
+        if flag not in values:
+            raise ValueError(f"未知标记: {flag}，可选: {', '.join(FLAGS)}")
+        for name, value in per_player.items():
+            values[flag][lookup(name, f"flags.{flag}")] = value
+    if order is not None:
+        order = tuple(lookup(name, "order") for name in order)
+        if sorted(order) != list(range(table.n_players)) or not 0 <= slot < table.n_players:
+            raise ValueError("order 必须包含全部团子，slot 必须在本轮范围内")
+    return State(
+        tuple((cell, tuple(index[name] for name in stacks[cell])) for cell in sorted(stacks)),
+        tuple(tuple(values[flag]) for flag in FLAGS),
+        rounds,
+        order,
+        slot,
+    )
+
+
+def odds_chunk(key, state, chunk_id, n, seed, params=None, track_length=TRACK_LENGTH):
+    table = compile_roster(get_roster(key), params, track_length)
+    rng = make_rng(chunk_seed(seed, chunk_id))
+    wins = [0] * table.n_players
+    for _ in range(n):
+        wins[play_from(table, state, rng).winner] += 1
+    return wins
+
+
+def conditional_wins(key, state, simulations, seed=0, workers=None, params=None, track_length=TRACK_LENGTH,
+                     chunk_size=CHUNK_SIZE, pool=None):
+    # 从同一快照分叉出 simulations 局，返回各团子的胜场
+    wins = [0] * len(get_roster(key)["players"])
+    args = [(key, state, chunk_id, n, seed, params, track_length)
+            for chunk_id, n in split_chunks(simulations, chunk_size)]
+    for part in map_chunks(odds_chunk, args, workers, pool):
+        wins = [a + b for a, b in zip(wins, part)]
+    return wins
+
+
+def parse_stacks(items):
+    # "7:卡卡罗,长离" -> {7: ["卡卡罗", "长离"]}（底 -> 顶）
+    stacks = {}
+    for item in items:
+        cell, _, names = item.partition(":")
+        stacks[int(cell)] = names.split(",")
+    return stacks
+
+
+def parse_flags(items):
+    # "赞妮.next_turn_extra=2"、"坎特蕾拉.has_merged=1"
+    flags = {}
+    for item in items:
+        target, _, value = item.partition("=")
+        name, _, flag = target.partition(".")
+        flags.setdefault(flag, {})[name] = int(value) if flag == "next_turn_extra" else value not in ("0", "false", "False")
+    return flags
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="从比赛中途的局面计算条件胜率")
+    parser.add_argument("roster", help="阵容，如 race1 ~ race5")
+    parser.add_argument("--stack", nargs="+", required=True, metavar="CELL:NAMES",
+                        help="每格的堆叠，底 -> 顶，如 7:卡卡罗,长离")
+    parser.add_argument("--flag", nargs="*", default=[], metavar="NAME.FLAG=VALUE",
+                        help=f"技能标记，可选 {', '.join(FLAGS)}，如 赞妮.next_turn_extra=2")
+    parser.add_argument("--round", type=int, default=0, help="当前轮数")
+    parser.add_argument("--order", default=None, help="本轮行动顺序（逗号分隔）；不给则从下一轮开始")
+    parser.add_argument("--slot", type=int, default=0, help="本轮下一个行动的位置（从 0 开始）")
+    parser.add_argument("-n", "--simulations", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    table = compile_roster(get_roster(args.roster))
+    order = args.order.split(",") if args.order else None
+    state = make_state(table, parse_stacks(args.stack), parse_flags(args.flag), args.round, order, args.slot)
+
+    start = time.perf_counter()
+    wins = conditional_wins(args.roster, state, args.simulations, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(f"从该局面出发模拟 {args.simulations} 局（耗时 {elapsed:.2f}s）")
+    for name, w in sorted(zip(table.names, wins), key=lambda x: x[1], reverse=True):
+        print(f"{name}: {w / args.simulations * 100:.2f}%")
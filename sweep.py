@@ -0,0 +1,129 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+
+from engine import simulate_game
+from rosters import DANGO, TRACK_LENGTH, make_roster
+from runner import chunk_seed, make_rng
+from skills import compile_roster
+
+# 阵容遍历：从 12 个团子中取出所有 4 人 / 6 人组合，逐个用 fast 引擎模拟
+# 每个阵容是一个任务，按预估开销从大到小提交到进程池（人数多的比赛回合多）；
+# 结果先按完成顺序收下，再按阵容列表的顺序写出，同样的参数每次得到相同的文件
+# 每个阵容的随机流由 (seed, 阵容) 派生，与调度顺序和进程数无关
+# 技能挂钩按 (技能类型, 规则) 缓存在 skills 中，编译上千个阵容时只合并一次
+
+SIZES = (4, 6)
+SIMULATIONS = 10000
+
+
+def lineups(sizes=SIZES):
+    # 阵容用 DANGO 下标的元组表示
+    return [lineup for size in sizes for lineup in combinations(range(len(DANGO)), size)]
+
+
+def lineup_id(lineup):
+    return "-".join(DANGO[i][0] for i in lineup)
+
+
+def schedule(lineups):
+    # 大任务先跑，避免最后只剩一个进程在跑大阵容
+    return sorted(lineups, key=len, reverse=True)
+
+
+def run_lineup(lineup, simulations, seed, rules="race3", track_length=TRACK_LENGTH):
+    table = compile_roster(make_roster([DANGO[i] for i in lineup], rules), track_length=track_length)
+    rng = make_rng(chunk_seed(seed, lineup_id(lineup)))
+    wins = [0] * len(lineup)
+    for _ in range(simulations):
+        wins[simulate_game(table, rng)] += 1
+    return lineup, wins
+
+
+def iter_completed(lineups, simulations, seed, workers, rules, track_length):
+    # 按完成顺序产出 (阵容, 各选手胜场)
+    tasks = schedule(lineups)
+    if workers == 1:
+        for lineup in tasks:
+            yield run_lineup(lineup, simulations, seed, rules, track_length)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_lineup, lineup, simulations, seed, rules, track_length) for lineup in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def iter_sweep(lineups, simulations, seed=0, workers=None, rules="race3", track_length=TRACK_LENGTH):
+    # 按 lineups 的顺序产出 (阵容, 各选手胜场)；先完成的结果暂存，直到它之前的阵容都已完成
+    workers = workers or os.cpu_count() or 1
+    position = {lineup: k for k, lineup in enumerate(lineups)}
+    pending = {}
+    next_k = 0
+    for lineup, wins in iter_completed(lineups, simulations, seed, workers, rules, track_length):
+        pending[position[lineup]] = (lineup, wins)
+        while next_k in pending:
+            yield pending.pop(next_k)
+            next_k += 1
+
+
+def write_sweep(path, results, simulations):
+    # 一行一个阵容，每个团子一列胜率，不在阵容中的留空
+    # 返回各团子的胜率列表，用于汇总
+    rates = defaultdict(list)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["阵容", "人数", "场数", *(name for _, name in DANGO)])
+        for lineup, wins in results:
+            row = [""] * len(DANGO)
+            for i, w in zip(lineup, wins):
+                row[i] = f"{w / simulations:.4f}"
+                rates[i].append((w / simulations, len(lineup)))
+            writer.writerow(["、".join(DANGO[i][1] for i in lineup), len(lineup), simulations, *row])
+            f.flush()
+    return rates
+
+
+def print_summary(rates):
+    # 平均胜率与公平份额（1/人数）之比，大于 1 说明强于平均
+    print("各团子在所有阵容中的平均胜率：")
+    summary = []
+    for i, values in rates.items():
+        mean = sum(r for r, _ in values) / len(values)
+        ratio = sum(r * size for r, size in values) / len(values)
+        summary.append((ratio, DANGO[i][1], mean, len(values)))
+    for ratio, name, mean, count in sorted(summary, reverse=True):
+        print(f"{name}: {mean * 100:.2f}%（{count} 个阵容，相对公平份额 {ratio:.3f}）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="遍历 12 个团子的所有阵容")
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(SIZES))
+    parser.add_argument("-n", "--simulations", type=int, default=SIMULATIONS, help="每个阵容的模拟次数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--rules", choices=("race1", "race3"), default="race3")
+    parser.add_argument("--track-length", type=int, default=TRACK_LENGTH)
+    parser.add_argument("-o", "--output", default="sweep.csv")
+    args = parser.parse_args()
+
+    todo = lineups(args.sizes)
+    start = time.perf_counter()
+    results = iter_sweep(todo, args.simulations, args.seed, args.workers, args.rules, args.track_length)
+
+    def progress(results):
+        for done, result in enumerate(results, 1):
+            if done % 50 == 0 or done == len(todo):
+                print(f"\r已完成 {done}/{len(todo)} 个阵容", end="", file=sys.stderr, flush=True)
+            yield result
+        print(file=sys.stderr)
+
+    rates = write_sweep(args.output, progress(results), args.simulations)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(todo)} 个阵容，每个 {args.simulations} 场，结果写入 {args.output}（耗时 {elapsed:.1f}s）")
+    print_summary(rates)
@@ -0,0 +1,307 @@
+import argparse
+import importlib
+import json
+import os
+import struct
+import time
+
+from engine import Game, play, start_order
+from rosters import TRACK_LENGTH, get_roster
+from runner import CHUNK_SIZE, chunk_seed, make_rng, map_chunks, split_chunks
+from skills import compile_roster
+
+# 回放磁带：把一局中的每次逻辑随机抽取记成一个字节，之后可以脱离全局随机状态单独重跑这一局
+#   shuffle / sample   结果排列中每个位置取自原序列的下标（开局堆叠、每轮行动顺序）
+#   randint(a, b)      点数 - a
+#   choice(seq)        选中的下标
+#   random()           技能判定的均匀数按 1/QUANTUM 量化后的格子编号
+# 记录时返回给比赛的就是量化后的值 (格子 + 0.5) / QUANTUM，所以回放与记录逐步一致；
+# 技能概率都是两位小数，与阈值的比较结果和未量化时的分布相同
+# 只记录逻辑结果、不记录随机源内部状态，同一条磁带可以喂给引擎，也可以喂给原脚本的 simulate_game(players, rng)
+# 开局的 sample 与 shuffle 记录的是同一种排列，所以引擎（sample）与 race1/2/4（shuffle）读同一条磁带
+# 文件格式：MAGIC，一行 JSON 头（阵容、种子、赛道长度、QUANTUM），之后每局一条 <局号 u4, 胜者 u1, 长度 u2> + 磁带
+
+QUANTUM = 100
+MAGIC = b"DANGOTAPE1\n"
+ENTRY = struct.Struct("<IBH")
+
+
+class TapeRecorder:
+    # 包装一个随机源，边抽取边记录；每局开始前调用 reset
+    def __init__(self, rng):
+        self.rng = rng
+        self.tape = bytearray()
+
+    def reset(self):
+        self.tape = bytearray()
+
+    def randint(self, a, b):
+        value = self.rng.randint(a, b)
+        self.tape.append(value - a)
+        return value
+
+    def choice(self, seq):
+        k = int(self.rng.random() * len(seq))
+        self.tape.append(k)
+        return seq[k]
+
+    def shuffle(self, x):
+        perm = list(range(len(x)))
+        self.rng.shuffle(perm)
+        self.tape += bytes(perm)
+        x[:] = [x[p] for p in perm]
+
+    def sample(self, population, k):
+        population = list(population)
+        perm = self.rng.sample(range(len(population)), k)
+        self.tape += bytes(perm)
+        return [population[p] for p in perm]
+
+    def random(self):
+        bucket = int(self.rng.random() * QUANTUM)
+        self.tape.append(bucket)
+        return (bucket + 0.5) / QUANTUM
+
+
+class TapeExhausted(ValueError):
+    pass
+
+
+class TapeRandom:
+    # 按顺序读出磁带的随机源，接口与 random 模块相同；读完后再抽取会抛出 TapeExhausted
+    # pad=True 时读完后一律返回 0 并计入 overrun：原脚本在胜者确定之后还会继续抽取
+    # （如 race3 今汐到达终点后仍判定一次技能），这些抽取不影响胜者
+    def __init__(self, tape, pad=False):
+        self.tape = bytes(tape)
+        self.read = iter(self.tape).__next__
+        self.pos = 0
+        self.pad = pad
+        self.overrun = 0
+
+    def _next(self):
+        try:
+            value = self.read()
+        except StopIteration:
+            if not self.pad:
+                raise TapeExhausted(f"磁带在第 {self.pos} 字节处读完") from None
+            self.overrun += 1
+            return 0
+        self.pos += 1
+        return value
+
+    def remaining(self):
+        return len(self.tape) - self.pos
+
+    def randint(self, a, b):
+        return a + self._next()
+
+    def choice(self, seq):
+        return seq[self._next()]
+
+    def shuffle(self, x):
+        perm = [self._next() for _ in range(len(x))]
+        x[:] = [x[p] for p in perm]
+
+    def sample(self, population, k):
+        population = list(population)
+        return [population[self._next()] for _ in range(k)]
+
+    def random(self):
+        return (self._next() + 0.5) / QUANTUM
+
+
+class EventGame(Game):
+    # 记录本局发生过的技能事件：概率技能判定成功记技能名，确定性技能记 "技能名:事件"
+    def __init__(self, table, rng):
+        super().__init__(table, rng)
+        self.events = set()
+
+    def chance(self, key):
+        hit = self.rng.random() < self.params[key]
+        if hit:
+            self.events.add(key)
+        return hit
+
+    def trigger(self, event):
+        self.events.add(event)
+
+
+def make_filter(table, events=(), winner=None, min_rounds=0):
+    # 返回 keep(game)：本局包含全部 events、胜者为 winner（名字）、轮数不少于 min_rounds
+    events = set(events)
+    winner = None if winner is None else table.names.index(winner)
+
+    def keep(game):
+        return (events <= game.events and (winner is None or game.winner == winner)
+                and game.rounds >= min_rounds)
+    return keep
+
+
+def record_chunk(key, chunk_id, n, seed, offset, events=(), winner=None, min_rounds=0,
+                 track_length=TRACK_LENGTH):
+    # 返回符合条件的 (局号, 胜者, 磁带) 列表
+    table = compile_roster(get_roster(key), track_length=track_length)
+    recorder = TapeRecorder(make_rng(chunk_seed(seed, chunk_id)))
+    keep = make_filter(table, events, winner, min_rounds)
+    kept = []
+    for g in range(n):
+        recorder.reset()
+        game = play(table, recorder, EventGame)
+        if keep(game):
+            kept.append((offset + g, game.winner, bytes(recorder.tape)))
+    return kept
+
+
+def write_tapes(path, key, simulations, seed=0, workers=None, events=(), winner=None, min_rounds=0, limit=None,
+                track_length=TRACK_LENGTH, chunk_size=CHUNK_SIZE):
+    # 返回写入的局数；limit 为最多保留的局数，达到后停止提交新块（进程池中同时最多 workers 个块）
+    workers = workers or os.cpu_count() or 1
+    chunks = split_chunks(simulations, chunk_size)
+    args = [(key, chunk_id, n, seed, chunk_id * chunk_size, tuple(events), winner, min_rounds, track_length)
+            for chunk_id, n in chunks]
+    header = {"roster": key, "seed": seed, "track_length": track_length, "quantum": QUANTUM}
+    written = 0
+    results = map_chunks(record_chunk, args, workers, window=workers)
+    with open(path, "wb") as f:
+        f.write(MAGIC + json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n")
+        try:
+            for kept in results:
+                kept = kept if limit is None else kept[:limit - written]
+                for game_id, game_winner, tape in kept:
+                    f.write(ENTRY.pack(game_id, game_winner, len(tape)) + tape)
+                written += len(kept)
+                if limit is not None and written >= limit:
+                    break
+        finally:
+            results.close()  # 取消尚未开始的块
+    return written
+
+
+def read_tapes(path):
+    # 返回 (文件头, [(局号, 胜者, 磁带), ...])
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} 不是回放磁带文件")
+        header = json.loads(f.readline())
+        data = f.read()
+    tapes = []
+    pos = 0
+    while pos < len(data):
+        game_id, winner, length = ENTRY.unpack_from(data, pos)
+        pos += ENTRY.size
+        tapes.append((game_id, winner, data[pos:pos + length]))
+        pos += length
+    return header, tapes
+
+
+def replay(table, tape, game_cls=Game):
+    # 全速重跑一局，返回 Game；磁带必须恰好读完
+    rng = TapeRandom(tape)
+    game = play(table, rng, game_cls)
+    if rng.remaining():
+        raise ValueError(f"对局结束时磁带还剩 {rng.remaining()} 字节")
+    return game
+
+
+def replay_reference(key, tape):
+    # 在原脚本上重跑同一条磁带，返回胜者名字
+    module = importlib.import_module(key)
+    rng = TapeRandom(tape, pad=True)
+    winner = module.simulate_game(module.create_players(), rng)
+    if rng.remaining():
+        raise ValueError(f"原脚本对局结束时磁带还剩 {rng.remaining()} 字节")
+    return winner
+
+
+def trace(table, tape, game_cls=Game):
+    # 逐步重跑：每个团子行动后产出 (轮数, 本轮顺序, 行动位置, 团子, 棋盘快照)，最后一步的 game.winner 已设置
+    rng = TapeRandom(tape)
+    game = game_cls(table, rng)
+    board = game.board
+    n = table.n_players
+    board.place(start_order(table, rng))
+    yield game, 0, None, None, None, board.snapshot()
+    while True:
+        game.rounds += 1
+        order = list(range(n))
+        rng.shuffle(order)
+        for i, hook in table.pre_order:
+            hook(game, i, order)
+        for slot, i in enumerate(order):
+            winner = game.take_turn(i, slot == 0, slot == n - 1)
+            if winner is not None:
+                game.winner = winner
+                game.turns = (game.rounds - 1) * n + slot + 1
+            yield game, game.rounds, order, slot, i, board.snapshot()
+            if winner is not None:
+                return
+        for hook in table.after_round:
+            hook(game)
+
+
+def format_stacks(names, snapshot):
+    return "  ".join(f"{cell}:[{'→'.join(names[p] for p in stack)}]" for cell, stack in snapshot)
+
+
+def print_trace(table, tape):
+    names = table.names
+    for game, rounds, order, slot, i, snapshot in trace(table, tape):
+        if order is None:
+            print(f"开局：{format_stacks(names, snapshot)}")
+            continue
+        if slot == 0:
+            print(f"第 {rounds} 轮，顺序：{'、'.join(names[p] for p in order)}")
+        print(f"  {names[i]}：{format_stacks(names, snapshot)}")
+    print(f"胜者：{names[game.winner]}（{game.rounds} 轮，{game.turns} 步）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对局回放磁带的记录与重放")
+    sub = parser.add_subparsers(dest="command", required=True)
+    record = sub.add_parser("record", help="模拟并保存符合条件的对局磁带")
+    record.add_argument("roster", help="阵容，如 race1 ~ race5")
+    record.add_argument("-n", "--simulations", type=int, default=100000)
+    record.add_argument("--seed", type=int, default=0)
+    record.add_argument("-j", "--workers", type=int, default=None)
+    record.add_argument("--event", action="append", default=[],
+                        help="本局必须发生的技能事件，如 ChangLi、KanTeLeiLa:merge，可重复")
+    record.add_argument("--winner", default=None, help="胜者名字")
+    record.add_argument("--min-rounds", type=int, default=0)
+    record.add_argument("--limit", type=int, default=None, help="最多保存的局数")
+    record.add_argument("-o", "--output", default="tapes.bin")
+    play_parser = sub.add_parser("replay", help="重放磁带文件")
+    play_parser.add_argument("path")
+    play_parser.add_argument("--game", type=int, default=None, help="只重放该局号，并逐步打印堆叠")
+    play_parser.add_argument("--reference", action="store_true", help="同时在原脚本上重放并比较胜者")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "record":
+        written = write_tapes(args.output, args.roster, args.simulations, args.seed, args.workers,
+                              args.event, args.winner, args.min_rounds, args.limit)
+        scope = "达到 --limit，" if args.limit is not None and written >= args.limit else f"{args.simulations} 局中"
+        print(f"{scope}保存了 {written} 局到 {args.output}（耗时 {time.perf_counter() - start:.2f}s）")
+    else:
+        header, tapes = read_tapes(args.path)
+        key = header["roster"]
+        table = compile_roster(get_roster(key), track_length=header["track_length"])
+        if args.game is not None:
+            tapes = [t for t in tapes if t[0] == args.game]
+            if not tapes:
+                raise SystemExit(f"磁带文件中没有第 {args.game} 局")
+            print_trace(table, tapes[0][2])
+        mismatches = 0
+        size = 0
+        for game_id, winner, tape in tapes:
+            size += len(tape)
+            got = replay(table, tape).winner
+            if got != winner:
+                mismatches += 1
+                print(f"第 {game_id} 局：记录胜者 {table.names[winner]}，重放胜者 {table.names[got]}")
+            if args.reference:
+                name = replay_reference(key, tape)
+                if name != table.names[winner]:
+                    mismatches += 1
+                    print(f"第 {game_id} 局：记录胜者 {table.names[winner]}，原脚本胜者 {name}")
+        print(f"重放 {len(tapes)} 局，平均每局 {size / max(len(tapes), 1):.0f} 字节，不一致 {mismatches} 局"
+              f"（耗时 {time.perf_counter() - start:.2f}s）")
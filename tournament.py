@@ -0,0 +1,182 @@
+import argparse
+import json
+import time
+from collections import Counter
+
+from engine import play
+from rosters import TRACK_LENGTH, get_roster, make_roster
+from runner import CHUNK_SIZE, chunk_seed, make_rng, map_chunks, split_chunks
+from skills import compile_roster
+
+# 整届赛事模拟：按赛程定义依次跑各阶段，后续阶段的阵容由前面阶段的名次决定
+# 赛程为 JSON：{"name": ..., "stages": [阶段, ...]}，阶段按顺序给出，每个阶段二选一：
+#   固定阵容   {"name": "A组", "roster": "race1"} 或 {"name": ..., "rules": "race3", "players": [[技能类型, 名字], ...]}
+#   晋级阵容   {"name": "总决赛", "rules": "race3", "entrants": [["A组决赛", 1], ["B组决赛", 2], ...]}（阶段名, 名次）
+# 最后一个阶段的胜者为总冠军；晋级阶段的规则默认 race3
+# 按届切块并行；同一块内多个赛程共用固定阵容阶段（小组赛）的同一批样本：第 t 届的小组赛名次对所有赛程相同，
+# 比较不同赛程时小组赛只跑一次，差异也不受小组赛抽样噪声影响
+# 样本按 (阵容, 该阵容在本赛程中第几次出现) 区分：同一赛程里阵容相同的两个阶段各自独立抽样，
+# 不同赛程中同一阵容的第 k 次出现共用样本
+# 晋级阵容按团子在小组赛中的出场顺序排列，相同的出线组合只编译一次挂钩表
+
+DEFAULT_BRACKET = {
+    "name": "默认赛程",
+    "stages": [
+        {"name": "A组", "roster": "race1"},
+        {"name": "B组", "roster": "race2"},
+        {"name": "A组决赛", "entrants": [["A组", 1], ["A组", 2], ["A组", 3], ["A组", 4]]},
+        {"name": "B组决赛", "entrants": [["B组", 1], ["B组", 2], ["B组", 3], ["B组", 4]]},
+        {"name": "总决赛", "entrants": [["A组决赛", 1], ["A组决赛", 2], ["B组决赛", 1], ["B组决赛", 2]]},
+    ],
+}
+
+
+def load_bracket(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def normalize_bracket(bracket):
+    # 校验并补全：固定阶段得到 players / rules / key（样本键），晋级阶段得到 rules；返回新的字典
+    stages = []
+    sizes = {}
+    pools = {}  # 阶段 -> 可能出场的团子
+    occurrences = Counter()
+    for stage in bracket["stages"]:
+        name = stage["name"]
+        if name in sizes:
+            raise ValueError(f"阶段名重复: {name}")
+        if "entrants" in stage:
+            for source, place in stage["entrants"]:
+                if source not in sizes:
+                    raise ValueError(f"{name}: 晋级来源 {source} 必须是之前的阶段")
+                if not 1 <= place <= sizes[source]:
+                    raise ValueError(f"{name}: {source} 只有 {sizes[source]} 个名次")
+            if len(set(map(tuple, stage["entrants"]))) != len(stage["entrants"]):
+                raise ValueError(f"{name}: 晋级名额重复")
+            sources = list(dict.fromkeys(source for source, _ in stage["entrants"]))
+            for k, a in enumerate(sources):
+                for b in sources[k + 1:]:
+                    if pools[a] & pools[b]:
+                        raise ValueError(f"{name}: {a} 与 {b} 可能出现同一个团子，不能晋级到同一阶段")
+            pools[name] = set().union(*(pools[source] for source in sources))
+            entrants = [tuple(e) for e in stage["entrants"]]
+            stages.append({"name": name, "rules": stage.get("rules", "race3"), "entrants": entrants})
+            sizes[name] = len(entrants)
+        else:
+            roster = get_roster(stage["roster"]) if "roster" in stage else make_roster(
+                map(tuple, stage["players"]), stage.get("rules", "race3"))
+            players = [tuple(p) for p in roster["players"]]
+            lineup = json.dumps([roster["rules"], players], ensure_ascii=False)
+            key = f"{lineup}#{occurrences[lineup]}"
+            occurrences[lineup] += 1
+            stages.append({"name": name, "rules": roster["rules"], "players": players, "key": key})
+            sizes[name] = len(players)
+            pools[name] = {player for _, player in players}
+    if not stages:
+        raise ValueError("赛程没有任何阶段")
+    return {"name": bracket.get("name", "赛程"), "stages": stages}
+
+
+def stage_names(bracket):
+    return [stage["name"] for stage in bracket["stages"]]
+
+
+def tournament_chunk(brackets, chunk_id, n, seed, track_length=TRACK_LENGTH):
+    # 返回每个赛程的 (各阶段出场次数 {阶段: Counter}, 夺冠次数 Counter)
+    fixed = {}
+    for bracket in brackets:
+        for stage in bracket["stages"]:
+            if "key" in stage:
+                fixed.setdefault(stage["key"], stage)
+
+    # 固定阵容阶段：每届一个名次（名字元组），所有赛程共用
+    samples = {}
+    kinds = {}
+    for key, stage in fixed.items():
+        table = compile_roster(make_roster(stage["players"], stage["rules"]), track_length=track_length)
+        rng = make_rng(chunk_seed(seed, f"{key}/{chunk_id}"))
+        names = table.names
+        samples[key] = [tuple(names[p] for p in play(table, rng).board.ranking()) for _ in range(n)]
+        for kind, name in stage["players"]:
+            kinds.setdefault(name, kind)
+    appearance = {name: i for i, name in enumerate(kinds)}
+
+    out = []
+    tables = {}
+    for b, bracket in enumerate(brackets):
+        rng = make_rng(chunk_seed(seed, f"bracket{b}/{chunk_id}"))
+        reach = {stage["name"]: Counter() for stage in bracket["stages"]}
+        champions = Counter()
+        for t in range(n):
+            results = {}
+            for stage in bracket["stages"]:
+                if "key" in stage:
+                    ranking = samples[stage["key"]][t]
+                else:
+                    names = [results[source][place - 1] for source, place in stage["entrants"]]
+                    if len(set(names)) != len(names):
+                        raise ValueError(f"{stage['name']}: 同一个团子占了多个晋级名额，请检查赛程")
+                    names.sort(key=appearance.__getitem__)
+                    lineup = (stage["rules"], tuple(names))
+                    table = tables.get(lineup)
+                    if table is None:
+                        roster = make_roster([(kinds[name], name) for name in names], stage["rules"])
+                        table = tables[lineup] = compile_roster(roster, track_length=track_length)
+                    ranking = tuple(names[p] for p in play(table, rng).board.ranking())
+                results[stage["name"]] = ranking
+                reach[stage["name"]].update(ranking)
+            champions[ranking[0]] += 1
+        out.append((reach, champions))
+    return out
+
+
+def run_tournaments(brackets, simulations, seed=0, workers=None, track_length=TRACK_LENGTH, chunk_size=CHUNK_SIZE):
+    brackets = [normalize_bracket(bracket) for bracket in brackets]
+    totals = [({name: Counter() for name in stage_names(bracket)}, Counter()) for bracket in brackets]
+    args = [(brackets, chunk_id, n, seed, track_length) for chunk_id, n in split_chunks(simulations, chunk_size)]
+    for parts in map_chunks(tournament_chunk, args, workers):
+        for (reach, champions), (part_reach, part_champions) in zip(totals, parts):
+            for name, counts in part_reach.items():
+                reach[name].update(counts)
+            champions.update(part_champions)
+    return brackets, totals
+
+
+def rjust(text, width):
+    # 中文字符按两个宽度对齐
+    return " " * (width - sum(2 if ord(c) > 127 else 1 for c in text)) + text
+
+
+def print_tournament(bracket, reach, champions, simulations):
+    stages = stage_names(bracket)
+    print(f"{bracket['name']}（{simulations} 届）：进入各阶段的概率，最后一列为夺冠概率")
+    print("团子".ljust(6) + "".join(rjust(name, 9) for name in stages) + rjust("夺冠", 8))
+    dango = {name for counts in reach.values() for name in counts}
+    for name in sorted(dango, key=lambda d: (-champions[d], -sum(reach[s][d] for s in stages))):
+        cells = "".join(f"{reach[s][name] / simulations * 100:8.2f}%" for s in stages)
+        print(name.ljust(8 - len(name)) + cells + f"{champions[name] / simulations * 100:7.2f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="整届赛事模拟：小组赛晋级到决赛")
+    parser.add_argument("brackets", nargs="*", help="赛程 JSON 文件，可给多个共用小组赛样本；默认使用内置赛程")
+    parser.add_argument("-n", "--simulations", type=int, default=100000, help="模拟届数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--track-length", type=int, default=TRACK_LENGTH)
+    parser.add_argument("--show-default", action="store_true", help="输出内置赛程的 JSON 后退出")
+    args = parser.parse_args()
+
+    if args.show_default:
+        print(json.dumps(DEFAULT_BRACKET, ensure_ascii=False, indent=2))
+        raise SystemExit
+
+    brackets = [load_bracket(path) for path in args.brackets] or [DEFAULT_BRACKET]
+    start = time.perf_counter()
+    brackets, totals = run_tournaments(brackets, args.simulations, args.seed, args.workers, args.track_length)
+    elapsed = time.perf_counter() - start
+    for bracket, (reach, champions) in zip(brackets, totals):
+        print_tournament(bracket, reach, champions, args.simulations)
+        print()
+    print(f"耗时 {elapsed:.2f}s")